@@ -44,5 +44,5 @@ def setup_colab_environment():
 
     print("Environment setup complete.")
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     setup_colab_environment()
\ No newline at end of file
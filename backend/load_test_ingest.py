@@ -0,0 +1,100 @@
+import os
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+
+import aiohttp
+
+from src.mock_data import generate_mock_data
+
+
+async def _submit(session, base_url, image_path, stats, latencies):
+    """
+    Uploads one receipt, retrying on 503 as the Retry-After header asks.
+    Returns the job ID or None.
+    """
+    while True:
+        data = aiohttp.FormData()
+        with open(image_path, "rb") as f:
+            data.add_field("receipt", f.read(), filename=os.path.basename(image_path), content_type="image/png")
+        start = time.perf_counter()
+        async with session.post(f"{base_url}/receipts", data=data) as resp:
+            latencies.append(time.perf_counter() - start)
+            if resp.status == 503:
+                stats["busy_retries"] += 1
+                await asyncio.sleep(float(resp.headers.get("Retry-After", "1")))
+                continue
+            body = await resp.json()
+            if resp.status != 202:
+                stats["errors"] += 1
+                return None
+            stats["submitted"] += 1
+            return body["jobs"][0]["job_id"]
+
+
+async def _wait_for_job(session, base_url, job_id, poll_interval):
+    while True:
+        async with session.get(f"{base_url}/jobs/{job_id}") as resp:
+            job = await resp.json()
+        if job.get("status") in ("done", "failed"):
+            return job
+        await asyncio.sleep(poll_interval)
+
+
+async def run_load_test(base_url, image_paths, concurrency=16, poll_interval=0.2):
+    stats = {"submitted": 0, "busy_retries": 0, "errors": 0, "done": 0, "failed": 0}
+    upload_latencies = []
+    job_latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def one(path):
+            async with semaphore:
+                start = time.perf_counter()
+                job_id = await _submit(session, base_url, path, stats, upload_latencies)
+                if job_id is None:
+                    return
+                job = await _wait_for_job(session, base_url, job_id, poll_interval)
+                stats[job["status"]] += 1
+                job_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(path) for path in image_paths))
+        elapsed = time.perf_counter() - start
+
+    def ms(values, p):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(p * (len(ordered) - 1)))] * 1000, 2)
+
+    return {
+        **stats,
+        "elapsed_s": round(elapsed, 3),
+        "receipts_per_s": round(len(image_paths) / elapsed, 2) if elapsed else None,
+        "upload_p50_ms": ms(upload_latencies, 0.5),
+        "upload_p95_ms": ms(upload_latencies, 0.95),
+        "job_p50_ms": ms(job_latencies, 0.5),
+        "job_p95_ms": ms(job_latencies, 0.95)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a locally running ingest server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--receipts", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--noise", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = generate_mock_data(corpus_dir, num_receipts=args.receipts, seed=args.seed, noise_level=args.noise)
+        results = asyncio.run(run_load_test(args.url, [entry["image_path"] for entry in corpus], args.concurrency))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
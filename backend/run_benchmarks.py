@@ -0,0 +1,271 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import pytesseract
+
+from src.mock_data import generate_mock_data
+from src.ocr_paddle import perform_ocr, parse_ocr_text_to_bill, get_ocr_tier_stats, reset_ocr_tier_stats
+from src.currency_converter import convert_to_inr
+from src.orchestrator import Orchestrator
+from src.columnar import ItemColumns
+from src.vendor_templates import VendorTemplateStore
+
+
+def _summarize(samples):
+    """
+    Reduces a list of per-call durations (seconds) to summary statistics in milliseconds.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "total_s": round(total, 6),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "p50_ms": round(pct(0.50), 4),
+        "p95_ms": round(pct(0.95), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "throughput_per_s": round(len(ordered) / total, 2) if total > 0 else None
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def _quiet(enabled=True):
+    """
+    The pipeline prints progress on every call; route it to /dev/null while timing.
+    """
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _tesseract_available():
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except pytesseract.TesseractNotFoundError:
+        return False
+
+
+def _sub_bill_from_parsed(bill, file_name):
+    """
+    Mirrors the totals process_single_receipt computes, without the OCR and mock validation steps.
+    """
+    total_orig = 0.0
+    total_inr = 0.0
+    for item in bill.get("items", []):
+        total_orig += item["quantity"] * item["unit_price_orig"]
+        inr_value, success = convert_to_inr(item["unit_price_orig"], item["currency"])
+        if success:
+            total_inr += item["quantity"] * inr_value
+    return {
+        "file_name": file_name,
+        "bill_id": bill.get("bill_id"),
+        "extracted_company": bill.get("customer_name", "N/A"),
+        "extracted_date": bill.get("bill_date", "N/A"),
+        "original_total": total_orig,
+        "total_inr": total_inr,
+    }
+
+
+def _synthetic_columns(num_items, items_per_receipt=10, seed=42):
+    """
+    Random item columns (about items_per_receipt items per receipt) for the bulk stage.
+    """
+    rng = np.random.default_rng(seed)
+    num_receipts = max(1, num_items // items_per_receipt)
+    currencies = np.array(["EUR", "GBP", "INR", "USD"])
+    columns = ItemColumns(
+        quantity=rng.integers(1, 5, num_items).astype(np.float64),
+        unit_price=rng.uniform(1, 500, num_items).round(2),
+        currency_idx=rng.integers(0, len(currencies), num_items),
+        currencies=currencies,
+        receipt_idx=np.sort(rng.integers(0, num_receipts, num_items)),
+        receipt_count=num_receipts)
+    return columns
+
+
+def run_columnar_benchmark(orchestrator, num_items, repeat=3, quiet=True):
+    """
+    Times per-receipt totals and consolidation over num_items synthetic line items,
+    i.e. the vectorized path at a scale the text corpus can't reach.
+    """
+    columns = _synthetic_columns(num_items)
+    samples = []
+    with _quiet(quiet):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            columns.reset_rates() # Include the per-currency rate lookup in every run
+            original, inr, _ = columns.receipt_totals()
+            sub_bills = [{"file_name": f"bulk_{i}", "extracted_company": f"Customer {i % 50}",
+                          "extracted_date": "2024-12-31", "original_total": o, "original_currency": "MIX",
+                          "total_inr": t} for i, (o, t) in enumerate(zip(original.tolist(), inr.tolist()))]
+            orchestrator.consolidate_bills(sub_bills, "BENCH_BULK", "Benchmark", "2024-12-31")
+            samples.append(time.perf_counter() - start)
+    stats = _summarize(samples)
+    stats["items"] = num_items
+    stats["items_per_s"] = num_items / stats["mean_ms"] * 1000 if stats["mean_ms"] else None
+    return stats
+
+
+def run_benchmarks(corpus, orchestrator, output_dir, repeat=3, run_ocr=True, quiet=True, vendor_templates=None):
+    """
+    Times each pipeline stage separately and end to end over a generated corpus.
+    Returns a dict of stage name -> summary statistics.
+    """
+    vendor_templates = vendor_templates or VendorTemplateStore(path=None)
+    texts = []
+    for entry in corpus:
+        with open(entry["text_path"], encoding="utf-8") as f:
+            texts.append((os.path.basename(entry["text_path"]), f.read()))
+
+    samples = {name: [] for name in (
+        "perform_ocr", "parse_ocr_text_to_bill", "vendor_template_parse", "convert_to_inr",
+        "consolidate_bills", "generate_pdf_report", "end_to_end_text", "end_to_end")}
+    pdf_path = os.path.join(output_dir, "bench_report.pdf")
+
+    with _quiet(quiet):
+        for _ in range(repeat):
+            if run_ocr:
+                for idx, entry in enumerate(corpus, start=1):
+                    _, elapsed = _timed(perform_ocr, entry["image_path"], idx)
+                    samples["perform_ocr"].append(elapsed)
+
+            parsed = []
+            for idx, (_, text) in enumerate(texts, start=1):
+                bill, elapsed = _timed(parse_ocr_text_to_bill, text, idx)
+                samples["parse_ocr_text_to_bill"].append(elapsed)
+                parsed.append(bill)
+
+            for idx, (_, text) in enumerate(texts, start=1):
+                _, elapsed = _timed(vendor_templates.parse, text, idx)
+                samples["vendor_template_parse"].append(elapsed)
+
+            for bill in parsed:
+                for item in bill["items"]:
+                    _, elapsed = _timed(convert_to_inr, item["unit_price_orig"], item["currency"])
+                    samples["convert_to_inr"].append(elapsed)
+
+            sub_bills = [_sub_bill_from_parsed(bill, name) for (name, _), bill in zip(texts, parsed)]
+            consolidated, elapsed = _timed(orchestrator.consolidate_bills, sub_bills, "BENCH_CB", "Benchmark", "2024-12-31")
+            samples["consolidate_bills"].append(elapsed)
+
+            _, elapsed = _timed(orchestrator.generate_pdf_report, consolidated, filename=pdf_path)
+            samples["generate_pdf_report"].append(elapsed)
+
+            # Text-only end to end: everything after OCR, from raw text to a rendered PDF.
+            start = time.perf_counter()
+            e2e_bills = [_sub_bill_from_parsed(parse_ocr_text_to_bill(text, idx), name)
+                         for idx, (name, text) in enumerate(texts, start=1)]
+            orchestrator.generate_pdf_report(
+                orchestrator.consolidate_bills(e2e_bills, "BENCH_CB", "Benchmark", "2024-12-31"), filename=pdf_path)
+            samples["end_to_end_text"].append(time.perf_counter() - start)
+
+            if run_ocr:
+                start = time.perf_counter()
+                e2e_bills = [orchestrator.process_single_receipt(entry["image_path"], idx)
+                             for idx, entry in enumerate(corpus, start=1)]
+                orchestrator.generate_pdf_report(
+                    orchestrator.consolidate_bills(e2e_bills, "BENCH_CB", "Benchmark", "2024-12-31"), filename=pdf_path)
+                samples["end_to_end"].append(time.perf_counter() - start)
+
+    return {name: _summarize(values) for name, values in samples.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the receipt pipeline on synthetic receipts.")
+    parser.add_argument("--receipts", type=int, default=50, help="Number of synthetic receipts to generate.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--noise", type=float, default=0.3, help="Layout/image noise level between 0 and 1.")
+    parser.add_argument("--min-items", type=int, default=1)
+    parser.add_argument("--max-items", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="Times to repeat each stage.")
+    parser.add_argument("--skip-ocr", action="store_true", help="Skip perform_ocr and the OCR end-to-end run.")
+    parser.add_argument("--corpus-dir", default=None, help="Where to write receipts (defaults to a temp dir).")
+    parser.add_argument("--output-dir", default="data/benchmarks")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output while timing.")
+    parser.add_argument("--columnar-items", type=int, default=1_000_000,
+                        help="Line items for the bulk consolidation stage (0 to skip).")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    run_ocr = not args.skip_ocr and _tesseract_available()
+    if not args.skip_ocr and not run_ocr:
+        print("Tesseract not found; OCR stages will be skipped.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = args.corpus_dir or tmp_dir
+        corpus = generate_mock_data(corpus_dir, num_receipts=args.receipts, seed=args.seed,
+                                    noise_level=args.noise, min_items=args.min_items,
+                                    max_items=args.max_items, render_images=run_ocr)
+        vendor_templates = VendorTemplateStore(path=None) # Start cold and keep benchmarks off the real store
+        with _quiet(not args.verbose):
+            orchestrator = Orchestrator(vendor_templates=vendor_templates)
+        reset_ocr_tier_stats()
+        stages = run_benchmarks(corpus, orchestrator, args.output_dir, repeat=args.repeat,
+                                run_ocr=run_ocr, quiet=not args.verbose, vendor_templates=vendor_templates)
+        if args.columnar_items:
+            stages["columnar_consolidation"] = run_columnar_benchmark(
+                orchestrator, args.columnar_items, repeat=args.repeat, quiet=not args.verbose)
+
+    commit = _git_commit()
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {
+            "receipts": args.receipts, "seed": args.seed, "noise": args.noise,
+            "min_items": args.min_items, "max_items": args.max_items,
+            "repeat": args.repeat, "ocr": run_ocr, "columnar_items": args.columnar_items
+        },
+        "stages": stages,
+        "ocr_tiers": get_ocr_tier_stats() if run_ocr else None,
+        "vendor_templates": vendor_templates.get_metrics()
+    }
+
+    out_path = os.path.join(args.output_dir, f"bench_{(commit or 'nogit')[:10]}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'Stage':<26} {'Count':>7} {'Mean ms':>10} {'p95 ms':>10} {'Per sec':>10}")
+    print("-" * 67)
+    for name, stats in stages.items():
+        if stats["count"]:
+            print(f"{name:<26} {stats['count']:>7} {stats['mean_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['throughput_per_s'] or 0:>10.1f}")
+        else:
+            print(f"{name:<26} {'skipped':>7}")
+    print(f"\nBenchmark results saved to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
 
 import os
 import json
+import argparse
 from datetime import datetime
 from src.orchestrator import Orchestrator
+from src.expense_store import ExpenseStore
 from src.ocr_paddle import setup_tesseract_and_font # Renamed to reflect the content
+from src.shm_images import process_receipts_shared
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive expense reconciliation pipeline.")
+    parser.add_argument("--ocr-processes", type=int, default=0,
+                        help="OCR worker processes fed decoded pages through shared memory (0 = process in-line).")
+    args = parser.parse_args(argv)
 
-def main():
     print("\n--- Expense Reconciliation Pipeline ---")
     print("Initializing services...")
 
@@ -14,6 +22,7 @@ def main():
     setup_tesseract_and_font()
 
     orchestrator = Orchestrator()
+    expense_store = ExpenseStore("data/expenses.db")
 
     print("\nProvide paths to your bill image/PDF files. Type 'end' when finished.")
 
@@ -36,18 +45,29 @@ def main():
         return
 
     print(f"\n--- Processing {len(input_files)} files ---")
+    grand_consolidated_id = f"GRAND_CB_{datetime.now().strftime('%Y%m%d%H%M%S')}"
     all_processed_sub_bills = []
-    for idx, file_path in enumerate(input_files):
-        print(f"\nProcessing file {idx+1}/{len(input_files)}: {file_path}")
-        try:
-            # The process_receipt_file in orchestrator will now return the parsed bill details
-            processed_bill = orchestrator.process_single_receipt(file_path, idx + 1)
+    if args.ocr_processes > 0:
+        # Decoding and OCR run in worker processes; pages move between them via shared memory.
+        for bill_idx, file_path, processed_bill in process_receipts_shared(input_files, ocr_workers=args.ocr_processes):
             if processed_bill:
                 all_processed_sub_bills.append(processed_bill)
+                expense_store.add_receipt(processed_bill, run_id=grand_consolidated_id)
             else:
                 print(f"Skipped {file_path} due to processing issues.")
-        except Exception as e:
-            print(f"An unexpected error occurred processing {file_path}: {e}")
+    else:
+        for idx, file_path in enumerate(input_files):
+            print(f"\nProcessing file {idx+1}/{len(input_files)}: {file_path}")
+            try:
+                # The process_receipt_file in orchestrator will now return the parsed bill details
+                processed_bill = orchestrator.process_single_receipt(file_path, idx + 1)
+                if processed_bill:
+                    all_processed_sub_bills.append(processed_bill)
+                    expense_store.add_receipt(processed_bill, run_id=grand_consolidated_id)
+                else:
+                    print(f"Skipped {file_path} due to processing issues.")
+            except Exception as e:
+                print(f"An unexpected error occurred processing {file_path}: {e}")
 
     if not all_processed_sub_bills:
         print("\nNo valid bills were processed for consolidation. Exiting.")
@@ -55,15 +75,16 @@ def main():
 
     print(f"\n--- Consolidating ALL processed bills into a single report ---")
 
-    grand_consolidated_id = f"GRAND_CB_{datetime.now().strftime('%Y%m%d%H%M%S')}"
     grand_consolidated_customer_name = "Overall Business Expenses" # Or prompt user
     consolidated_date = datetime.now().strftime('%Y-%m-%d')
 
-    grand_consolidated_bill = orchestrator.consolidate_bills(
-        all_processed_sub_bills,
+    # Every receipt of this run is in the expense store; build the report from a query on it.
+    grand_consolidated_bill = orchestrator.consolidate_from_store(
+        expense_store,
         grand_consolidated_id,
         grand_consolidated_customer_name,
-        consolidated_date
+        consolidated_date,
+        filters={"run_id": grand_consolidated_id}
     )
 
     if grand_consolidated_bill:
@@ -80,5 +101,5 @@ def main():
 
     print("\nPipeline finished.")
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     main()
\ No newline at end of file
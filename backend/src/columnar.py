@@ -0,0 +1,146 @@
+# src/columnar.py
+from collections.abc import Sequence
+
+import numpy as np
+
+from src.currency_converter import convert_to_inr
+
+# Row counts below this are built eagerly as plain lists; only bulk reports go lazy.
+LAZY_ROWS_THRESHOLD = 10_000
+
+
+class LazyRows(Sequence):
+    """
+    Read-only list whose rows are built on access. Used for report line items so
+    description strings are only formatted for rows that actually get rendered.
+    Compares equal to a list with the same rows, but is not JSON-serialisable as is;
+    call to_list() first.
+    """
+
+    def __init__(self, count, build_row):
+        self._count = count
+        self._build_row = build_row
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._build_row(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("row index out of range")
+        return self._build_row(index)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None # Mutable-sequence semantics, like list
+
+    def to_list(self):
+        return [self._build_row(i) for i in range(self._count)]
+
+
+def build_rows(count, build_row, lazy_threshold=LAZY_ROWS_THRESHOLD):
+    """
+    Returns the rows as a plain list, or as LazyRows once count reaches lazy_threshold.
+    """
+    if count < lazy_threshold:
+        return [build_row(i) for i in range(count)]
+    return LazyRows(count, build_row)
+
+
+class ItemColumns:
+    """
+    Line items of many receipts held as parallel NumPy arrays: quantity, unit price,
+    currency code (as an index into `currencies`) and owning receipt. The original
+    item dicts are kept by reference only, for error messages and descriptions.
+    """
+
+    def __init__(self, quantity, unit_price, currency_idx, currencies, receipt_idx, receipt_count, items=None):
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.currency_idx = currency_idx
+        self.currencies = currencies
+        self.receipt_idx = receipt_idx
+        self.receipt_count = receipt_count
+        self.items = items
+        self._rates = None
+
+    @classmethod
+    def from_bills(cls, bills):
+        """
+        Builds columns from parsed bills (each with an 'items' list as produced by
+        parse_ocr_text_to_bill).
+        """
+        counts = [len(bill.get("items") or []) for bill in bills]
+        items = [item for bill in bills for item in (bill.get("items") or [])]
+        n = len(items)
+        quantity = np.fromiter((item["quantity"] for item in items), dtype=np.float64, count=n)
+        unit_price = np.fromiter((item["unit_price_orig"] for item in items), dtype=np.float64, count=n)
+        codes = np.array([str(item["currency"]) for item in items], dtype=str)
+        currencies, currency_idx = np.unique(codes, return_inverse=True)
+        receipt_idx = np.repeat(np.arange(len(bills)), counts)
+        return cls(quantity, unit_price, currency_idx.reshape(-1), currencies, receipt_idx, len(bills), items)
+
+    def __len__(self):
+        return len(self.quantity)
+
+    def currency_rates(self):
+        """
+        Returns (rate to INR, supported flag) per entry of `currencies`, asking the
+        converter once per distinct currency rather than once per item.
+        """
+        if self._rates is not None:
+            return self._rates
+        rates = np.zeros(len(self.currencies))
+        supported = np.zeros(len(self.currencies), dtype=bool)
+        for i, code in enumerate(self.currencies):
+            rate, ok = convert_to_inr(1.0, code)
+            rates[i] = rate if ok else 0.0
+            supported[i] = ok
+        self._rates = (rates, supported)
+        return self._rates
+
+    def reset_rates(self):
+        """
+        Drops the cached per-currency rates so the next call asks the converter again.
+        """
+        self._rates = None
+
+    def receipt_totals(self):
+        """
+        Grouped per-receipt reductions. Returns three arrays indexed by receipt:
+        original-currency total (all items), INR total (convertible items only) and
+        the number of items that converted.
+        """
+        rates, supported = self.currency_rates()
+        item_supported = supported[self.currency_idx]
+        line_orig = self.quantity * self.unit_price
+        line_inr = np.where(item_supported, self.quantity * (self.unit_price * rates[self.currency_idx]), 0.0)
+        original = np.bincount(self.receipt_idx, weights=line_orig, minlength=self.receipt_count)
+        inr = np.bincount(self.receipt_idx, weights=line_inr, minlength=self.receipt_count)
+        converted = np.bincount(self.receipt_idx, weights=item_supported, minlength=self.receipt_count).astype(np.int64)
+        return original, inr, converted
+
+    def unconverted_items(self):
+        """
+        Yields the item dicts whose currency has no INR rate.
+        """
+        _, supported = self.currency_rates()
+        for i in np.flatnonzero(~supported[self.currency_idx]):
+            yield self.items[i]
+
+
+def grouped_sum(keys, values):
+    """
+    Sums values per distinct key. Returns {key: total} in sorted key order.
+    """
+    if len(keys) == 0:
+        return {}
+    unique_keys, inverse = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+    sums = np.bincount(inverse.reshape(-1), weights=values, minlength=len(unique_keys))
+    return {key: float(total) for key, total in zip(unique_keys.tolist(), sums.tolist())}
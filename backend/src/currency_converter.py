@@ -1,5 +1,11 @@
 # src/currency_converter.py
+import os
+import threading
 
+from src.rate_providers import RateCache, StaticRateProvider, FileRateProvider, HttpRateProvider
+
+# Built-in INR rates. Used as-is when no rate source is configured, and as the
+# cold-start fallback when the configured source can't be reached.
 EXCHANGE_RATES = {
     "INR": 1.0,
     "USD": 83.50, # Example rate (1 USD = 83.50 INR)
@@ -9,9 +15,58 @@ EXCHANGE_RATES = {
     "AED": 22.75, # UAE Dirham example rate
 }
 
+# Rate source configuration. RATES_URL wins over RATES_FILE; with neither set the
+# built-in table above is used.
+RATES_CONFIG = {
+    "url": os.environ.get("RATES_URL"),
+    "file": os.environ.get("RATES_FILE"),
+    "ttl_seconds": float(os.environ.get("RATES_TTL_SECONDS", 3600)),
+    "snapshot_path": os.environ.get("RATES_SNAPSHOT", "data/rates_snapshot.json"),
+}
+
+_rate_cache = None
+_rate_cache_lock = threading.Lock()
+
+
+def default_rate_provider():
+    if RATES_CONFIG["url"]:
+        return HttpRateProvider(RATES_CONFIG["url"])
+    if RATES_CONFIG["file"]:
+        return FileRateProvider(RATES_CONFIG["file"])
+    return StaticRateProvider(EXCHANGE_RATES, name="builtin")
+
+
+def configure_rates(provider=None, ttl_seconds=None, snapshot_path=None):
+    """
+    Installs the rate cache convert_to_inr reads from. Call once at startup;
+    provider defaults to the one selected by RATES_CONFIG. Returns the cache.
+    """
+    global _rate_cache
+    provider = provider or default_rate_provider()
+    if isinstance(provider, StaticRateProvider):
+        snapshot_path = None # Nothing worth persisting
+    elif snapshot_path is None:
+        snapshot_path = RATES_CONFIG["snapshot_path"]
+    cache = RateCache(provider, ttl_seconds=ttl_seconds or RATES_CONFIG["ttl_seconds"], snapshot_path=snapshot_path,
+                      fallback=StaticRateProvider(EXCHANGE_RATES, name="builtin"))
+    with _rate_cache_lock:
+        _rate_cache = cache
+    return cache
+
+
+def get_rate_cache():
+    cache = _rate_cache
+    if cache is None:
+        with _rate_cache_lock:
+            cache = _rate_cache
+        if cache is None:
+            cache = configure_rates()
+    return cache
+
+
 def convert_to_inr(amount, currency_code):
     """
-    Converts an amount from a given currency to INR using predefined rates.
+    Converts an amount from a given currency to INR using the configured rate source.
     Returns the converted amount and a boolean indicating success.
     """
     if amount is None or amount == "" : # Handle empty or None amounts
@@ -24,12 +79,14 @@ def convert_to_inr(amount, currency_code):
         print(f"Warning: Could not convert amount '{amount}' to float for currency conversion.")
         return 0.0, False # Return zero, indicate failure
 
-    if currency_code not in EXCHANGE_RATES:
-        print(f"Warning: Currency code '{currency_code}' not supported in EXCHANGE_RATES. Defaulting to original amount.")
-        return amount, False # Return original amount, indicate failure
-
     if currency_code == "INR":
         return amount, True # No conversion needed if already INR
 
-    inr_value = amount * EXCHANGE_RATES[currency_code]
-    return inr_value, True
\ No newline at end of file
+    rate = get_rate_cache().get_rate(currency_code)
+    if rate is None:
+        # Never pass a foreign amount through as if it were INR.
+        print(f"Warning: No exchange rate for currency code '{currency_code}'. Amount excluded from INR totals.")
+        return 0.0, False
+
+    inr_value = amount * rate
+    return inr_value, True
@@ -0,0 +1,193 @@
+# src/distributed.py
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+from datetime import datetime
+
+from src.job_queue import SQLiteJobQueue
+from src.orchestrator import Orchestrator
+from src.ocr_paddle import setup_tesseract_and_font
+from src.ingest_gate import apply_memory_ceiling
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _LeaseHeartbeat:
+    """
+    Renews a lease in the background while its holder is busy (a worker OCR-ing a job,
+    or a coordinator writing the batch report), so long work isn't handed to another
+    node mid-flight. renew(*args) must return False once the lease is lost.
+    """
+
+    def __init__(self, job_queue, renew, *args):
+        self.job_queue = job_queue
+        self.renew = renew
+        self.args = args
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        interval = max(self.job_queue.lease_seconds / 3.0, 0.1)
+        while not self.stop_event.wait(interval):
+            if not self.renew(*self.args):
+                return # Lease lost; completing will be rejected anyway
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def run_worker(job_queue, orchestrator=None, worker_id=None, batch_id=None, idle_timeout=None, poll_interval=2.0):
+    """
+    Claims receipts from the shared queue and processes them with process_single_receipt
+    until the queue stays empty for idle_timeout seconds (forever if None).
+    Returns the number of jobs this worker completed.
+    """
+    orchestrator = orchestrator or Orchestrator()
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+    idle_since = time.monotonic()
+    print(f"Worker {worker_id} polling {job_queue.db_path}")
+
+    while True:
+        job = job_queue.claim(worker_id, batch_id=batch_id)
+        if job is None:
+            if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                print(f"Worker {worker_id} idle for {idle_timeout}s, exiting after {completed} jobs.")
+                return completed
+            time.sleep(poll_interval)
+            continue
+
+        idle_since = time.monotonic()
+        print(f"Worker {worker_id} claimed bill {job['bill_idx']} ({job['file_path']}), attempt {job['attempts']}")
+        try:
+            with _LeaseHeartbeat(job_queue, job_queue.renew_lease, job["job_id"], worker_id):
+                result = orchestrator.process_single_receipt(job["file_path"], job["bill_idx"])
+        except Exception as e:
+            job_queue.fail(job["job_id"], worker_id, e)
+            print(f"Worker {worker_id} failed bill {job['bill_idx']}: {e}")
+            continue
+
+        if job_queue.complete(job["job_id"], worker_id, result):
+            completed += 1
+        else:
+            print(f"Worker {worker_id} lost the lease on bill {job['bill_idx']}; result discarded.")
+
+
+def run_coordinator(job_queue, batch_id, orchestrator=None, coordinator_id=None, poll_interval=2.0,
+                    output_dir="data/reconciled_results", customer_name="Overall Business Expenses"):
+    """
+    Waits until every job in the batch is done or failed, then consolidates the results
+    under a consolidation lease, so one coordinator writes the report while the others
+    wait and take over only if it dies or fails. The batch is marked consolidated once
+    the report is written. Returns the consolidated bill, or None if another coordinator
+    finished it or nothing could be consolidated.
+    Raises ValueError right away if the batch doesn't exist or has no jobs.
+    """
+    job_count = job_queue.batch_job_count(batch_id)
+    if job_count is None:
+        raise ValueError(f"Unknown batch ID '{batch_id}'.")
+    if job_count == 0:
+        raise ValueError(f"Batch '{batch_id}' has no jobs to wait for.")
+    orchestrator = orchestrator or Orchestrator()
+    coordinator_id = coordinator_id or default_worker_id()
+
+    while not job_queue.is_batch_finished(batch_id):
+        progress = job_queue.batch_progress(batch_id)
+        print(f"Batch {batch_id} progress: {progress}")
+        time.sleep(poll_interval)
+
+    for failure in job_queue.batch_failures(batch_id):
+        print(f"Warning: {failure['file_path']} failed permanently: {failure['error']}")
+
+    waiting = False
+    while not job_queue.claim_consolidation(batch_id, coordinator_id):
+        state = job_queue.consolidation_state(batch_id)
+        if state["consolidated_at"] is not None:
+            print(f"Batch {batch_id} was already consolidated by {state['consolidated_by']}.")
+            return None
+        if not waiting: # Another coordinator is on it; take over if its lease lapses
+            print(f"Batch {batch_id} is being consolidated by {state['consolidated_by']}; waiting.")
+            waiting = True
+        time.sleep(poll_interval)
+
+    try:
+        with _LeaseHeartbeat(job_queue, job_queue.renew_consolidation, batch_id, coordinator_id):
+            grand_consolidated_bill = orchestrator.consolidate_bills(
+                job_queue.batch_results(batch_id),
+                f"GRAND_CB_{batch_id}",
+                customer_name,
+                datetime.now().strftime('%Y-%m-%d')
+            )
+            if grand_consolidated_bill:
+                os.makedirs(output_dir, exist_ok=True)
+                pdf_filename = os.path.join(output_dir, f"grand_consolidated_bill_{batch_id}.pdf")
+                orchestrator.generate_pdf_report(grand_consolidated_bill, filename=pdf_filename, type="consolidated")
+    except Exception:
+        job_queue.release_consolidation(batch_id, coordinator_id) # Let another coordinator retry
+        raise
+    if not job_queue.complete_consolidation(batch_id, coordinator_id):
+        print(f"Warning: Lost the consolidation lease on batch {batch_id}; another coordinator may also write its report.")
+    return grand_consolidated_bill
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed OCR over a shared SQLite job queue.")
+    parser.add_argument("--queue", required=True, help="Path to the queue database on the shared directory.")
+    parser.add_argument("--lease-seconds", type=float, default=120.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="Enqueue receipt files as a new batch.")
+    submit.add_argument("files", nargs="+")
+    submit.add_argument("--batch-id", default=None)
+
+    worker = sub.add_parser("worker", help="Claim and process receipts.")
+    worker.add_argument("--batch-id", default=None, help="Only work on this batch.")
+    worker.add_argument("--idle-timeout", type=float, default=None, help="Exit after this many idle seconds.")
+    worker.add_argument("--memory-limit-mb", type=int, default=None, help="Address-space ceiling for this worker.")
+
+    coordinate = sub.add_parser("coordinate", help="Wait for a batch and consolidate it.")
+    coordinate.add_argument("batch_id")
+    coordinate.add_argument("--output-dir", default="data/reconciled_results")
+
+    args = parser.parse_args(argv)
+    job_queue = SQLiteJobQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+
+    if args.command == "submit":
+        missing = [path for path in args.files if not os.path.exists(path)]
+        for path in missing:
+            print(f"Warning: File '{path}' not found. Skipping.")
+        try:
+            batch_id = job_queue.submit_batch([os.path.abspath(p) for p in args.files if p not in missing], args.batch_id)
+        except ValueError as e:
+            sys.exit(f"Error: {e}")
+        print(batch_id)
+    elif args.command == "worker":
+        if args.memory_limit_mb:
+            apply_memory_ceiling(args.memory_limit_mb * 1024 * 1024)
+        setup_tesseract_and_font()
+        run_worker(job_queue, batch_id=args.batch_id, idle_timeout=args.idle_timeout)
+    else:
+        setup_tesseract_and_font()
+        orchestrator = Orchestrator()
+        try:
+            grand_consolidated_bill = run_coordinator(job_queue, args.batch_id, orchestrator=orchestrator,
+                                                      output_dir=args.output_dir)
+        except ValueError as e:
+            sys.exit(f"Error: {e}")
+        if grand_consolidated_bill:
+            orchestrator.print_receipt(grand_consolidated_bill, type="consolidated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# src/expense_store.py
+import os
+import json
+import time
+import sqlite3
+import argparse
+from contextlib import closing
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    expense_id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    file_name TEXT,
+    bill_id TEXT,
+    customer TEXT NOT NULL,
+    expense_date TEXT,
+    raw_date TEXT,
+    currency TEXT NOT NULL,
+    country TEXT NOT NULL,
+    original_total REAL,
+    total_inr REAL,
+    is_outlier INTEGER NOT NULL,
+    tax_pct_valid INTEGER NOT NULL,
+    vat_reg_valid INTEGER NOT NULL,
+    has_errors INTEGER NOT NULL,
+    pipeline_errors TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_run ON expenses(run_id);
+CREATE INDEX IF NOT EXISTS idx_expenses_customer ON expenses(customer, expense_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(expense_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_currency ON expenses(currency, expense_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_country ON expenses(country, expense_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_flags ON expenses(is_outlier, tax_pct_valid, vat_reg_valid, expense_date);
+
+-- Daily rollup over every indexed dimension, maintained by trigger so group-by
+-- queries that only touch these columns never scan the expenses table.
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    day TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    country TEXT NOT NULL,
+    is_outlier INTEGER NOT NULL,
+    tax_pct_valid INTEGER NOT NULL,
+    vat_reg_valid INTEGER NOT NULL,
+    receipt_count INTEGER NOT NULL,
+    total_inr REAL NOT NULL,
+    original_total REAL NOT NULL,
+    PRIMARY KEY (day, customer, currency, country, is_outlier, tax_pct_valid, vat_reg_valid)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_customer ON daily_rollups(customer, day);
+CREATE INDEX IF NOT EXISTS idx_rollups_currency ON daily_rollups(currency, day);
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO daily_rollups (day, customer, currency, country, is_outlier, tax_pct_valid, vat_reg_valid,
+                               receipt_count, total_inr, original_total)
+    VALUES (COALESCE(NEW.expense_date, 'unknown'), NEW.customer, NEW.currency, NEW.country, NEW.is_outlier,
+            NEW.tax_pct_valid, NEW.vat_reg_valid, 1, COALESCE(NEW.total_inr, 0), COALESCE(NEW.original_total, 0))
+    ON CONFLICT (day, customer, currency, country, is_outlier, tax_pct_valid, vat_reg_valid) DO UPDATE SET
+        receipt_count = receipt_count + 1,
+        total_inr = total_inr + excluded.total_inr,
+        original_total = original_total + excluded.original_total;
+END;
+"""
+
+
+def _period_sql(date_sql, kind):
+    """
+    SQL deriving a period key from an ISO date expression; undated rows map to 'unknown'.
+    """
+    period = {
+        "day": date_sql,
+        "month": f"substr({date_sql}, 1, 7)",
+        "quarter": f"substr({date_sql}, 1, 4) || '-Q' || ((CAST(substr({date_sql}, 6, 2) AS INTEGER) + 2) / 3)",
+        "year": f"substr({date_sql}, 1, 4)",
+    }[kind]
+    return f"CASE WHEN {date_sql} = 'unknown' THEN 'unknown' ELSE {period} END"
+
+
+# Group-by dimensions: name -> (SQL over expenses, SQL over daily_rollups or None).
+# Period dimensions are derived from the ISO date so both tables can serve them.
+DIMENSIONS = {
+    "customer": ("customer", "customer"),
+    "currency": ("currency", "currency"),
+    "country": ("country", "country"),
+    "is_outlier": ("is_outlier", "is_outlier"),
+    "tax_pct_valid": ("tax_pct_valid", "tax_pct_valid"),
+    "vat_reg_valid": ("vat_reg_valid", "vat_reg_valid"),
+    **{kind: (_period_sql("COALESCE(expense_date, 'unknown')", kind), _period_sql("day", kind))
+       for kind in ("day", "month", "quarter", "year")},
+    "run_id": ("run_id", None),
+    "file_name": ("file_name", None),
+}
+
+# Equality filters: name -> (column on expenses, column on daily_rollups).
+FILTERS = {
+    "customer": ("customer", "customer"),
+    "currency": ("currency", "currency"),
+    "country": ("country", "country"),
+    "is_outlier": ("is_outlier", "is_outlier"),
+    "tax_pct_valid": ("tax_pct_valid", "tax_pct_valid"),
+    "vat_reg_valid": ("vat_reg_valid", "vat_reg_valid"),
+    "has_errors": ("has_errors", None),
+    "run_id": ("run_id", None),
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%y", "%d/%m/%y")
+
+
+def normalize_date(raw_date):
+    """
+    Converts an OCR'd date into ISO YYYY-MM-DD, or None if it can't be read.
+    """
+    if not raw_date or raw_date == "N/A":
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(raw_date).strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+class ExpenseStore:
+    """
+    Embedded (SQLite) store of processed receipts with secondary indexes on
+    customer, date, currency, country and validation flags, plus a trigger-maintained
+    daily rollup table. aggregate() answers group-by queries from the rollup whenever
+    the requested dimensions and filters allow it, and from the indexed base table
+    otherwise.
+    """
+
+    def __init__(self, db_path="data/expenses.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Writes ---
+
+    def add_receipts(self, processed_bills, run_id=None):
+        """
+        Stores receipts as returned by Orchestrator.process_single_receipt.
+        Returns the number of rows written.
+        """
+        now = time.time()
+        rows = []
+        for bill in processed_bills:
+            if not bill:
+                continue
+            errors = bill.get("pipeline_errors") or []
+            rows.append((
+                run_id,
+                bill.get("file_name"),
+                bill.get("bill_id"),
+                bill.get("extracted_company") or "N/A",
+                normalize_date(bill.get("extracted_date")),
+                bill.get("extracted_date"),
+                bill.get("original_currency") or "N/A",
+                bill.get("country_determined") or "N/A",
+                bill.get("original_total"),
+                bill.get("total_inr"),
+                int(bool(bill.get("is_outlier"))),
+                int(bool(bill.get("tax_pct_valid"))),
+                int(bool(bill.get("vat_reg_valid"))),
+                int(bool(errors)),
+                json.dumps(errors),
+                now
+            ))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO expenses (run_id, file_name, bill_id, customer, expense_date, raw_date, currency, country, "
+                "original_total, total_inr, is_outlier, tax_pct_valid, vat_reg_valid, has_errors, pipeline_errors, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def add_receipt(self, processed_bill, run_id=None):
+        return self.add_receipts([processed_bill], run_id=run_id)
+
+    # --- Reads ---
+
+    def _where(self, filters, date_from, date_to, use_rollup):
+        """
+        Builds a WHERE clause from equality filters and an inclusive ISO date range.
+        """
+        clauses = []
+        params = []
+        column_idx = 1 if use_rollup else 0
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter '{name}'. Choose from: {', '.join(FILTERS)}")
+            clauses.append(f"{FILTERS[name][column_idx]} = ?")
+            params.append(int(value) if isinstance(value, bool) else value)
+        date_column = "day" if use_rollup else "expense_date"
+        if use_rollup and (date_from or date_to):
+            clauses.append("day != 'unknown'")
+        if date_from:
+            clauses.append(f"{date_column} >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append(f"{date_column} <= ?")
+            params.append(date_to)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _can_use_rollup(self, group_by, filters):
+        return (all(DIMENSIONS[dim][1] is not None for dim in group_by) and
+                all(FILTERS[name][1] is not None for name, value in (filters or {}).items() if value is not None))
+
+    def aggregate(self, group_by=(), filters=None, date_from=None, date_to=None, order_by="total_inr"):
+        """
+        Group-by aggregation, e.g. total INR by customer for a quarter:
+            store.aggregate(["customer"], date_from="2024-07-01", date_to="2024-09-30")
+        Returns a list of dicts with the group columns plus receipt_count, total_inr
+        and original_total (original_total only makes sense when grouped by currency).
+        """
+        group_by = list(group_by)
+        for dim in group_by:
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown group-by dimension '{dim}'. Choose from: {', '.join(DIMENSIONS)}")
+        for name in (filters or {}):
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter '{name}'. Choose from: {', '.join(FILTERS)}")
+
+        use_rollup = self._can_use_rollup(group_by, filters)
+        column_idx = 1 if use_rollup else 0
+        select = [f"{DIMENSIONS[dim][column_idx]} AS {dim}" for dim in group_by]
+        if use_rollup:
+            select += ["SUM(receipt_count) AS receipt_count", "SUM(total_inr) AS total_inr",
+                       "SUM(original_total) AS original_total"]
+            table = "daily_rollups"
+        else:
+            select += ["COUNT(*) AS receipt_count", "COALESCE(SUM(total_inr), 0) AS total_inr",
+                       "COALESCE(SUM(original_total), 0) AS original_total"]
+            table = "expenses"
+
+        where, params = self._where(filters, date_from, date_to, use_rollup)
+        sql = f"SELECT {', '.join(select)} FROM {table}{where}"
+        if group_by:
+            sql += " GROUP BY " + ", ".join(dim for dim in group_by)
+        if order_by in ("total_inr", "receipt_count", "original_total"):
+            sql += f" ORDER BY {order_by} DESC"
+        elif order_by in group_by:
+            sql += f" ORDER BY {order_by}"
+
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def query(self, filters=None, date_from=None, date_to=None, limit=None):
+        """
+        Returns matching receipts in insertion order, shaped like the output of
+        process_single_receipt so they can be fed straight to consolidate_bills.
+        """
+        where, params = self._where(filters, date_from, date_to, use_rollup=False)
+        sql = f"SELECT * FROM expenses{where} ORDER BY expense_id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [{
+            "file_name": row["file_name"],
+            "bill_id": row["bill_id"] if row["bill_id"] is not None else "N/A", # Same placeholder as missing fields upstream
+            "extracted_company": row["customer"],
+            "extracted_date": row["raw_date"],
+            "original_total": row["original_total"],
+            "original_currency": row["currency"],
+            "total_inr": row["total_inr"],
+            "is_outlier": bool(row["is_outlier"]),
+            "tax_pct_valid": bool(row["tax_pct_valid"]),
+            "vat_reg_valid": bool(row["vat_reg_valid"]),
+            "country_determined": row["country"],
+            "pipeline_errors": json.loads(row["pipeline_errors"] or "[]")
+        } for row in rows]
+
+
+def _parse_flag(value):
+    return None if value is None else value.lower() in ("1", "true", "yes", "y")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query processed expenses.")
+    parser.add_argument("--db", default="data/expenses.db")
+    parser.add_argument("--group-by", default="", help=f"Comma-separated: {', '.join(DIMENSIONS)}")
+    parser.add_argument("--from", dest="date_from", help="Inclusive start date (YYYY-MM-DD).")
+    parser.add_argument("--to", dest="date_to", help="Inclusive end date (YYYY-MM-DD).")
+    parser.add_argument("--customer")
+    parser.add_argument("--currency")
+    parser.add_argument("--country")
+    parser.add_argument("--run-id")
+    for flag in ("is-outlier", "tax-pct-valid", "vat-reg-valid", "has-errors"):
+        parser.add_argument(f"--{flag}", help="true/false")
+    parser.add_argument("--list", action="store_true", help="List matching receipts instead of aggregating.")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    filters = {
+        "customer": args.customer,
+        "currency": args.currency.upper() if args.currency else None,
+        "country": args.country,
+        "run_id": args.run_id,
+        "is_outlier": _parse_flag(args.is_outlier),
+        "tax_pct_valid": _parse_flag(args.tax_pct_valid),
+        "vat_reg_valid": _parse_flag(args.vat_reg_valid),
+        "has_errors": _parse_flag(args.has_errors),
+    }
+    store = ExpenseStore(args.db)
+
+    if args.list:
+        for row in store.query(filters, args.date_from, args.date_to, limit=args.limit):
+            print(f"{row['extracted_date'] or 'N/A':<12} {row['extracted_company'][:24]:<24} {row['original_currency']:<5} "
+                  f"{row['total_inr'] if row['total_inr'] is not None else float('nan'):>12.2f} INR  {row['file_name']}")
+        return
+
+    group_by = [dim.strip() for dim in args.group_by.split(",") if dim.strip()]
+    results = store.aggregate(group_by, filters, args.date_from, args.date_to)
+    header = [*group_by, "receipt_count", "total_inr"]
+    print("  ".join(f"{col:>18}" for col in header))
+    print("-" * (20 * len(header)))
+    for row in results[:args.limit]:
+        values = [str(row[dim]) for dim in group_by] + [str(row["receipt_count"]), f"{row['total_inr']:.2f}"]
+        print("  ".join(f"{value:>18}" for value in values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# src/ingest_gate.py
+import os
+import math
+
+from PIL import Image
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+# Budgets for a single receipt. Anything over max_bytes / max_pixels is rejected from
+# the header alone; images over target_pixels are decoded at reduced size.
+INGEST_LIMITS = {
+    "max_bytes": 25 * 1024 * 1024,
+    "max_pixels": 80_000_000,
+    "target_pixels": 12_000_000, # ~4000 x 3000, plenty for receipt OCR
+    "max_decoded_bytes": 256 * 1024 * 1024, # Full-size decode budget for formats without draft mode
+}
+
+# (offset, signature, kind). Checked against the first bytes of the file.
+MAGIC_SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"\xff\xd8\xff", "jpeg"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (0, b"II*\x00", "tiff"),
+    (0, b"MM\x00*", "tiff"),
+    (0, b"BM", "bmp"),
+    (8, b"WEBP", "webp"),
+    (0, b"%PDF-", "pdf"),
+]
+SUPPORTED_IMAGE_KINDS = {"png", "jpeg", "gif", "tiff", "bmp", "webp"}
+MAGIC_BYTES_NEEDED = 16
+
+# Bytes per pixel once decoded, per PIL mode.
+_MODE_BYTES = {"1": 1, "L": 1, "P": 1, "LA": 2, "I;16": 2, "RGB": 3, "YCbCr": 3, "LAB": 3, "HSV": 3,
+               "RGBA": 4, "CMYK": 4, "I": 4, "F": 4}
+
+# Modes Image.reduce() averages correctly. Others (bilevel, palette, 16-bit) are
+# converted to grayscale before reducing.
+_REDUCIBLE_MODES = {"L", "LA", "La", "RGB", "RGBA", "RGBa", "RGBX", "CMYK", "YCbCr", "LAB", "HSV", "I", "F"}
+
+
+class IngestRejected(Exception):
+    """
+    Raised when a receipt file fails the ingestion gate. The message says why;
+    too_large marks byte/pixel/memory budget violations as opposed to bad content.
+    """
+
+    def __init__(self, reason, too_large=False):
+        super().__init__(reason)
+        self.too_large = too_large
+
+
+def sniff_file_type(header_bytes):
+    """
+    Identifies a file from its leading magic bytes. Returns a kind such as 'png'
+    or 'pdf', or None if unrecognised.
+    """
+    for offset, signature, kind in MAGIC_SIGNATURES:
+        if header_bytes[offset:offset + len(signature)] == signature:
+            if kind == "webp" and header_bytes[:4] != b"RIFF":
+                continue
+            return kind
+    return None
+
+
+def inspect_receipt_file(path, limits=None):
+    """
+    Validates a receipt from its size, magic bytes and image header only; no pixel
+    data is decoded. Returns {"kind", "bytes", "width", "height", "mode"} or raises
+    IngestRejected.
+    """
+    limits = limits or INGEST_LIMITS
+    size = os.path.getsize(path)
+    if size == 0:
+        raise IngestRejected("File is empty.")
+    if size > limits["max_bytes"]:
+        raise IngestRejected(f"File is {size} bytes, over the {limits['max_bytes']} byte limit.", too_large=True)
+
+    with open(path, "rb") as f:
+        kind = sniff_file_type(f.read(MAGIC_BYTES_NEEDED))
+    if kind is None:
+        raise IngestRejected("Unrecognised file type (not a supported image).")
+    if kind not in SUPPORTED_IMAGE_KINDS:
+        raise IngestRejected(f"'{kind}' files are not supported by the image OCR path.")
+
+    try:
+        # Lazy: reads the header, not the pixels. max_pixels sits below Pillow's bomb
+        # warning threshold, so only the hard DecompressionBombError needs handling here.
+        with Image.open(path) as img:
+            width, height = img.size
+            mode = img.mode
+    except Image.DecompressionBombError as e:
+        raise IngestRejected(f"Image rejected as a decompression bomb: {e}", too_large=True)
+    except (OSError, SyntaxError, ValueError) as e:
+        raise IngestRejected(f"Corrupt or unreadable image header: {e}")
+
+    if width <= 0 or height <= 0 or width * height > limits["max_pixels"]:
+        raise IngestRejected(f"Image is {width}x{height}, over the {limits['max_pixels']} pixel limit.", too_large=True)
+
+    return {"kind": kind, "bytes": size, "width": width, "height": height, "mode": mode}
+
+
+def open_receipt_image(path, limits=None):
+    """
+    Opens a receipt that passed inspect_receipt_file as a grayscale image no larger
+    than target_pixels. JPEGs are decoded straight at reduced scale via draft(); other
+    formats must fit the full-size decode budget and are reduced right after loading.
+    """
+    limits = limits or INGEST_LIMITS
+    info = inspect_receipt_file(path, limits)
+    pixels = info["width"] * info["height"]
+    scale = math.sqrt(limits["target_pixels"] / pixels) if pixels > limits["target_pixels"] else 1.0
+
+    img = Image.open(path)
+    try:
+        if scale < 1.0 and info["kind"] == "jpeg":
+            img.draft("L", (max(1, int(info["width"] * scale)), max(1, int(info["height"] * scale))))
+        else:
+            decoded_bytes = pixels * _MODE_BYTES.get(info["mode"], 4)
+            if decoded_bytes > limits["max_decoded_bytes"]:
+                raise IngestRejected(
+                    f"Decoding {info['width']}x{info['height']} {info['mode']} needs {decoded_bytes} bytes, "
+                    f"over the {limits['max_decoded_bytes']} byte budget.", too_large=True)
+
+        img.load()
+        if img.width * img.height > limits["target_pixels"]:
+            if img.mode not in _REDUCIBLE_MODES:
+                converted = img.convert("L")
+                img.close()
+                img = converted
+            factor = math.ceil(math.sqrt(img.width * img.height / limits["target_pixels"]))
+            reduced = img.reduce(factor)
+            img.close()
+            img = reduced
+        gray = img.convert("L")
+    finally:
+        img.close()
+    return gray
+
+
+def apply_memory_ceiling(max_bytes):
+    """
+    Caps this process's address space (RLIMIT_AS) so a worker that still runs away
+    fails with MemoryError instead of taking the host down. No-op where unsupported.
+    Returns True if the limit was applied.
+    """
+    if resource is None or not max_bytes:
+        return False
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            max_bytes = min(max_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+        return True
+    except (ValueError, OSError) as e:
+        print(f"Warning: Could not apply memory ceiling of {max_bytes} bytes: {e}")
+        return False
@@ -0,0 +1,286 @@
+# src/ingest_server.py
+import os
+import uuid
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from aiohttp import web
+
+from src.orchestrator import Orchestrator
+from src.ocr_paddle import setup_tesseract_and_font
+from src.ingest_gate import sniff_file_type, inspect_receipt_file, apply_memory_ceiling, IngestRejected, MAGIC_BYTES_NEEDED
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class IngestService:
+    """
+    Async HTTP front end for the Orchestrator.
+    Uploads are streamed to disk chunk by chunk and handed to a bounded job queue
+    drained by a fixed pool of worker threads. When the queue is full new uploads
+    are refused with 503 + Retry-After instead of piling up in memory.
+    """
+
+    def __init__(self, orchestrator=None, upload_dir="data/incoming_receipts/uploads", workers=4,
+                 max_queue=64, max_upload_bytes=20 * 1024 * 1024, max_finished_jobs=10000):
+        self.orchestrator = orchestrator or Orchestrator()
+        self.upload_dir = upload_dir
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_upload_bytes = max_upload_bytes
+        self.max_finished_jobs = max_finished_jobs
+
+        self.jobs = OrderedDict() # job_id -> job record, oldest first
+        self.queue = None # Created on startup so it binds to the server's event loop
+        self.executor = None
+        self.worker_tasks = []
+        self.bill_counter = 0
+        self.stats = {"accepted": 0, "rejected_busy": 0, "rejected_too_large": 0, "rejected_invalid": 0, "completed": 0, "failed": 0}
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+    # --- Lifecycle ---
+
+    async def start(self, app=None):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr-worker")
+        self.worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"IngestService started: {self.workers} workers, queue capacity {self.max_queue}.")
+
+    async def stop(self, app=None):
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+    def build_app(self):
+        app = web.Application(client_max_size=self.max_upload_bytes)
+        app.router.add_post("/receipts", self.handle_upload)
+        app.router.add_get("/jobs/{job_id}", self.handle_job_status)
+        app.router.add_get("/health", self.handle_health)
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        return app
+
+    # --- Handlers ---
+
+    def _busy_response(self):
+        self.stats["rejected_busy"] += 1
+        return web.json_response(
+            {"error": "OCR queue is full, retry later.", "queue_depth": self.queue.qsize()},
+            status=503, headers={"Retry-After": "1"})
+
+    async def handle_upload(self, request):
+        """
+        POST /receipts (multipart/form-data). Every file part becomes one job.
+        Returns 202 with the job IDs, or 503 when the queue has no room.
+        """
+        # Admission control: refuse before reading a single byte of the body.
+        if self.queue.full():
+            return self._busy_response()
+
+        try:
+            reader = await request.multipart()
+        except (AssertionError, ValueError):
+            return web.json_response({"error": "Expected multipart/form-data upload."}, status=400)
+
+        accepted = []
+        rejected = []
+        while True:
+            part = await reader.next()
+            if part is None:
+                break
+            if not part.filename:
+                await part.release()
+                continue
+            if self.queue.full():
+                rejected.append({"file_name": part.filename, "reason": "queue full", "status": 503})
+                self.stats["rejected_busy"] += 1
+                await part.release()
+                continue
+
+            job_id = uuid.uuid4().hex
+            file_name = os.path.basename(part.filename)
+            if file_name in ("", ".", ".."): # Would name the job directory itself
+                file_name = "receipt"
+            # One directory per job keeps the original name (which is what results report)
+            # without clashing with other uploads of the same name.
+            file_path = os.path.join(self.upload_dir, job_id, file_name)
+            os.makedirs(os.path.dirname(file_path))
+            try:
+                size = await self._stream_part_to_disk(part, file_path)
+                # Header-only check (dimensions, decompression bombs) before it costs a worker slot.
+                inspect_receipt_file(file_path)
+            except IngestRejected as e:
+                self._remove_upload_file(file_path)
+                rejected.append({"file_name": file_name, "reason": str(e), "status": 413 if e.too_large else 415})
+                self.stats["rejected_too_large" if e.too_large else "rejected_invalid"] += 1
+                continue
+
+            self.bill_counter += 1
+            job = {
+                "job_id": job_id,
+                "status": "queued",
+                "file_name": file_name,
+                "file_path": file_path,
+                "bytes": size,
+                "bill_idx": self.bill_counter,
+                "submitted_at": datetime.now().isoformat(timespec="seconds"),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            try:
+                self.queue.put_nowait(job_id)
+            except asyncio.QueueFull: # Lost the race for the last slot to another upload
+                self._remove_upload_file(file_path)
+                rejected.append({"file_name": file_name, "reason": "queue full", "status": 503})
+                self.stats["rejected_busy"] += 1
+                continue
+            self.jobs[job_id] = job
+            self.stats["accepted"] += 1
+            accepted.append({"job_id": job_id, "file_name": file_name, "status_url": f"/jobs/{job_id}"})
+
+        if not accepted and not rejected:
+            return web.json_response({"error": "No file parts found in upload."}, status=400)
+        if not accepted:
+            status = rejected[0]["status"]
+            if status == 503:
+                return web.json_response({"error": "OCR queue is full, retry later.", "rejected": rejected},
+                                         status=503, headers={"Retry-After": "1"})
+            return web.json_response({"error": "Upload rejected.", "rejected": rejected}, status=status)
+        return web.json_response({"jobs": accepted, "rejected": rejected}, status=202)
+
+    async def _stream_part_to_disk(self, part, file_path):
+        """
+        Copies one multipart part to disk in fixed-size chunks so memory use per upload
+        stays at one chunk. The file type is sniffed from the first chunk, so non-images
+        are refused before the rest of the body is read. Returns the byte count or raises
+        IngestRejected.
+        """
+        size = 0
+        with open(file_path, "wb") as f:
+            while True:
+                chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0:
+                    kind = sniff_file_type(chunk[:MAGIC_BYTES_NEEDED])
+                    if kind is None or kind == "pdf":
+                        await part.release()
+                        raise IngestRejected(f"Unsupported file type: {kind or 'unrecognised'}.")
+                size += len(chunk)
+                if size > self.max_upload_bytes:
+                    await part.release()
+                    raise IngestRejected(f"Upload exceeds {self.max_upload_bytes} bytes.", too_large=True)
+                f.write(chunk)
+        if size == 0:
+            raise IngestRejected("Upload is empty.")
+        return size
+
+    async def handle_job_status(self, request):
+        """
+        GET /jobs/{job_id}. Includes the processed receipt once the job is done.
+        """
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "Unknown job ID."}, status=404)
+        return web.json_response({k: v for k, v in job.items() if k != "file_path"})
+
+    async def handle_health(self, request):
+        return web.json_response({
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.max_queue,
+            "workers": self.workers,
+            "jobs_tracked": len(self.jobs),
+            **self.stats
+        })
+
+    # --- Workers ---
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job is None:
+                    continue
+                job["status"] = "running"
+                job["started_at"] = datetime.now().isoformat(timespec="seconds")
+                try:
+                    job["result"] = await loop.run_in_executor(
+                        self.executor, self.orchestrator.process_single_receipt, job["file_path"], job["bill_idx"])
+                    job["status"] = "done"
+                    self.stats["completed"] += 1
+                except Exception as e:
+                    job["status"] = "failed"
+                    job["error"] = str(e)
+                    self.stats["failed"] += 1
+                finally:
+                    self._remove_upload(job)
+                job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+                self._evict_finished_jobs()
+            finally:
+                self.queue.task_done()
+
+    def _remove_upload(self, job):
+        """
+        Deletes a job's uploaded file; the result is all that's kept once it has run.
+        """
+        self._remove_upload_file(job["file_path"])
+
+    @staticmethod
+    def _remove_upload_file(file_path):
+        """
+        Deletes an uploaded file and its per-job directory.
+        """
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not remove upload {file_path}: {e}")
+            return
+        try:
+            os.rmdir(os.path.dirname(file_path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not remove upload directory {os.path.dirname(file_path)}: {e}")
+
+    def _evict_finished_jobs(self):
+        """
+        Keeps the job table bounded by dropping the oldest finished jobs.
+        """
+        excess = len(self.jobs) - self.max_finished_jobs
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self.jobs.items() if job["status"] in ("done", "failed")][:excess]:
+            self._remove_upload(self.jobs.pop(job_id)) # Normally already gone; covers any leftovers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the receipt ingestion HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent OCR workers.")
+    parser.add_argument("--max-queue", type=int, default=64, help="Queued receipts before uploads get 503.")
+    parser.add_argument("--max-upload-mb", type=float, default=20.0)
+    parser.add_argument("--upload-dir", default="data/incoming_receipts/uploads")
+    parser.add_argument("--memory-limit-mb", type=int, default=None, help="Address-space ceiling for the service.")
+    args = parser.parse_args(argv)
+
+    if args.memory_limit_mb:
+        apply_memory_ceiling(args.memory_limit_mb * 1024 * 1024)
+    setup_tesseract_and_font()
+    service = IngestService(upload_dir=args.upload_dir, workers=args.workers, max_queue=args.max_queue,
+                            max_upload_bytes=int(args.max_upload_mb * 1024 * 1024))
+    web.run_app(service.build_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# src/job_queue.py
+import json
+import time
+import uuid
+import sqlite3
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    consolidated_by TEXT,
+    consolidated_at REAL,
+    consolidation_lease_expires REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    batch_id TEXT NOT NULL REFERENCES batches(batch_id),
+    file_path TEXT NOT NULL,
+    bill_idx INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker_id TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id, status);
+"""
+
+
+class SQLiteJobQueue:
+    """
+    Lease-based receipt job queue stored in a single SQLite file.
+    Put the file on a directory every worker node can reach. A job claimed by a worker
+    is 'leased' until lease_expires; if the worker dies the lease lapses and the next
+    claim picks the job up again. Lease times use wall-clock seconds, so nodes need
+    roughly synchronized clocks (NTP).
+    """
+
+    def __init__(self, db_path, lease_seconds=120.0, max_attempts=3, busy_timeout=30.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.busy_timeout = busy_timeout
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            conn.execute("BEGIN IMMEDIATE")
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(batches)")}
+            if "consolidation_lease_expires" not in columns: # Queue file from before consolidation leases
+                conn.execute("ALTER TABLE batches ADD COLUMN consolidation_lease_expires REAL")
+            conn.execute("COMMIT")
+
+    def _connect(self):
+        # A fresh connection per operation keeps the queue safe to share across threads
+        # and processes; isolation_level=None lets us issue BEGIN IMMEDIATE ourselves.
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Producer side ---
+
+    def submit_batch(self, file_paths, batch_id=None):
+        """
+        Enqueues one job per receipt file and returns the batch ID.
+        Raises ValueError for an empty file list, since such a batch could never finish.
+        """
+        if not file_paths:
+            raise ValueError("Cannot submit a batch with no receipt files.")
+        batch_id = batch_id or f"BATCH_{uuid.uuid4().hex[:12]}"
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO batches (batch_id, created_at) VALUES (?, ?)", (batch_id, now))
+            conn.executemany(
+                "INSERT INTO jobs (job_id, batch_id, file_path, bill_idx, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(uuid.uuid4().hex, batch_id, path, idx, now) for idx, path in enumerate(file_paths, start=1)])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return batch_id
+
+    # --- Worker side ---
+
+    def claim(self, worker_id, batch_id=None):
+        """
+        Leases the next pending (or lease-expired) job to worker_id.
+        Returns the job as a dict, or None when nothing is claimable.
+        Jobs that already used max_attempts are marked failed instead of re-leased.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            query = ("SELECT * FROM jobs WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+                     + (" AND batch_id = ?" if batch_id else "") + " ORDER BY bill_idx LIMIT 1")
+            while True:
+                row = conn.execute(query, (now, batch_id) if batch_id else (now,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                if row["attempts"] >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', worker_id = NULL, lease_expires = NULL, "
+                        "error = COALESCE(error, 'Lease expired after max attempts.'), updated_at = ? WHERE job_id = ?",
+                        (now, row["job_id"]))
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (worker_id, now + self.lease_seconds, now, row["job_id"]))
+                conn.execute("COMMIT")
+                job = dict(row)
+                job.update(status="leased", worker_id=worker_id, attempts=row["attempts"] + 1)
+                return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew_lease(self, job_id, worker_id):
+        """
+        Extends a lease the worker still holds. Returns False if the lease was lost.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, time.time(), job_id, worker_id))
+            return cur.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Stores the job result. Ignored (returns False) if another worker has since
+        taken over the lease, so a late, presumed-dead worker cannot clobber it.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), job_id, worker_id))
+            return cur.rowcount == 1
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Records an error. The job goes back to pending until it runs out of attempts.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, worker_id = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND status = 'leased'",
+                (self.max_attempts, str(error), time.time(), job_id, worker_id))
+            return cur.rowcount == 1
+
+    # --- Coordinator side ---
+
+    def batch_progress(self, batch_id):
+        """
+        Returns a {status: count} dict for the batch.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE batch_id = ? GROUP BY status", (batch_id,)).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def batch_job_count(self, batch_id):
+        """
+        Returns the number of jobs in the batch, or None if no such batch was submitted.
+        """
+        with closing(self._connect()) as conn:
+            if conn.execute("SELECT 1 FROM batches WHERE batch_id = ?", (batch_id,)).fetchone() is None:
+                return None
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE batch_id = ?", (batch_id,)).fetchone()[0]
+
+    def is_batch_finished(self, batch_id):
+        progress = self.batch_progress(batch_id)
+        return bool(progress) and not progress.get("pending") and not progress.get("leased")
+
+    def batch_results(self, batch_id):
+        """
+        Returns the stored results of all finished jobs in bill order.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT result FROM jobs WHERE batch_id = ? AND status = 'done' ORDER BY bill_idx",
+                (batch_id,)).fetchall()
+        return [json.loads(row["result"]) for row in rows]
+
+    def batch_failures(self, batch_id):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT file_path, error FROM jobs WHERE batch_id = ? AND status = 'failed' ORDER BY bill_idx",
+                (batch_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim_consolidation(self, batch_id, coordinator_id):
+        """
+        Leases the batch's consolidation to coordinator_id. Only one coordinator holds
+        the lease at a time; if it dies before complete_consolidation the lease lapses
+        and another coordinator can take over. Returns False once the batch is
+        consolidated or while another coordinator's lease is live.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE batches SET consolidated_by = ?, consolidation_lease_expires = ? "
+                "WHERE batch_id = ? AND consolidated_at IS NULL "
+                "AND (consolidated_by IS NULL OR consolidation_lease_expires < ?)",
+                (coordinator_id, now + self.lease_seconds, batch_id, now))
+            return cur.rowcount == 1
+
+    def renew_consolidation(self, batch_id, coordinator_id):
+        """
+        Extends a consolidation lease the coordinator still holds. Returns False if it was lost.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE batches SET consolidation_lease_expires = ? "
+                "WHERE batch_id = ? AND consolidated_by = ? AND consolidated_at IS NULL",
+                (time.time() + self.lease_seconds, batch_id, coordinator_id))
+            return cur.rowcount == 1
+
+    def complete_consolidation(self, batch_id, coordinator_id):
+        """
+        Marks the batch consolidated once the report is written. Returns False if the
+        lease was lost to another coordinator in the meantime.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE batches SET consolidated_at = ?, consolidation_lease_expires = NULL "
+                "WHERE batch_id = ? AND consolidated_by = ? AND consolidated_at IS NULL",
+                (time.time(), batch_id, coordinator_id))
+            return cur.rowcount == 1
+
+    def release_consolidation(self, batch_id, coordinator_id):
+        """
+        Gives the consolidation lease up (e.g. after a failed report) so another
+        coordinator can claim it straight away.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE batches SET consolidated_by = NULL, consolidation_lease_expires = NULL "
+                "WHERE batch_id = ? AND consolidated_by = ? AND consolidated_at IS NULL",
+                (batch_id, coordinator_id))
+            return cur.rowcount == 1
+
+    def consolidation_state(self, batch_id):
+        """
+        Returns {"consolidated_by", "consolidated_at"}; consolidated_at stays None until
+        the report has been written.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT consolidated_by, consolidated_at FROM batches WHERE batch_id = ?",
+                               (batch_id,)).fetchone()
+        return dict(row) if row is not None else None
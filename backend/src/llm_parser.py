@@ -1,7 +1,7 @@
 # src/llm_parser.py
 
 class LLMParser:
-    def _init_(self, model_name="mock_llm"):
+    def __init__(self, model_name="mock_llm"):
         self.model_name = model_name
         print(f"LLMParser initialized with model: {self.model_name} (Currently a mock service)")
 
@@ -0,0 +1,168 @@
+# src/mock_data.py
+import os
+import json
+import random
+from datetime import date, timedelta
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Vendors, items and currencies used to synthesize receipts. Prices are in the
+# vendor's own currency so the generated corpus exercises convert_to_inr.
+MOCK_VENDORS = [
+    {"name": "Chai Point Pvt Ltd", "address": "12 MG Road, Bengaluru, India", "currency": "INR"},
+    {"name": "Blue Bottle Coffee", "address": "300 Webster St, Oakland, USA", "currency": "USD"},
+    {"name": "Le Petit Bistro", "address": "8 Rue Cler, Paris, France", "currency": "EUR"},
+    {"name": "Pret A Manger", "address": "1 Kingsway, London, UK", "currency": "GBP"},
+    {"name": "Lawson Akihabara", "address": "4-2 Sotokanda, Tokyo, Japan", "currency": "JPY"},
+    {"name": "Al Mallah Cafeteria", "address": "Al Dhiyafah Rd, Dubai, UAE", "currency": "AED"},
+    {"name": "Office Depot", "address": "6600 N Military Trl, Boca Raton, USA", "currency": "USD"},
+    {"name": "Croma Electronics", "address": "Phoenix Mills, Mumbai, India", "currency": "INR"},
+]
+
+MOCK_ITEMS = [
+    ("Espresso", 2.5), ("Sandwich", 6.0), ("Printer Paper", 9.5), ("Cab Fare", 18.0),
+    ("Hotel Room", 120.0), ("Notebook", 3.25), ("USB Cable", 11.0), ("Lunch Buffet", 22.0),
+    ("Mineral Water", 1.2), ("Conference Pass", 250.0), ("Parking", 7.5), ("Train Ticket", 35.0),
+]
+
+# Rough multipliers so JPY/INR receipts carry realistic magnitudes.
+CURRENCY_PRICE_SCALE = {"INR": 80.0, "USD": 1.0, "EUR": 0.9, "GBP": 0.8, "JPY": 150.0, "AED": 3.7}
+
+MOCK_CUSTOMERS = ["Acme Corp", "Globex Ltd", "Initech", "Umbrella Holdings", "Stark Industries"]
+
+NOISE_LINES = ["Thank you for visiting!", "*** COPY ***", "Tel +00 1234 5678", "www.example.com", "~~~~~~~~~~~~", "GSTIN 27AAACB1234F1Z5"]
+
+
+def generate_receipt_spec(rng, receipt_idx, min_items=1, max_items=8, start_date=date(2024, 1, 1)):
+    """
+    Builds the ground-truth structure of one synthetic receipt.
+    """
+    vendor = rng.choice(MOCK_VENDORS)
+    currency = vendor["currency"]
+    scale = CURRENCY_PRICE_SCALE.get(currency, 1.0)
+    items = []
+    for description, base_price in rng.sample(MOCK_ITEMS, rng.randint(min_items, min(max_items, len(MOCK_ITEMS)))):
+        items.append({
+            "description": description,
+            "quantity": rng.randint(1, 5),
+            "unit_price_orig": round(base_price * scale * rng.uniform(0.8, 1.2), 2),
+            "currency": currency
+        })
+    return {
+        "bill_id": f"INV-{receipt_idx:06d}",
+        "vendor": vendor["name"],
+        "address": vendor["address"],
+        "customer_name": rng.choice(MOCK_CUSTOMERS),
+        "bill_date": (start_date + timedelta(days=rng.randint(0, 364))).strftime("%Y-%m-%d"),
+        "currency": currency,
+        "items": items,
+        "grand_total": round(sum(i["quantity"] * i["unit_price_orig"] for i in items), 2)
+    }
+
+
+def render_receipt_text(spec, rng, noise_level=0.0):
+    """
+    Renders a receipt spec as OCR-like text in the layout parse_ocr_text_to_bill expects.
+    noise_level (0..1) controls junk lines, stray blank lines and ragged indentation.
+    """
+    lines = [spec["vendor"], spec["address"]]
+    header = [
+        f"Invoice No: {spec['bill_id']}",
+        f"Customer: {spec['customer_name']}",
+        f"Date: {spec['bill_date']}",
+    ]
+    if rng.random() < noise_level:
+        rng.shuffle(header)
+    lines.extend(header)
+    lines.append("Description Qty Price")
+    for item in spec["items"]:
+        lines.append(f"{item['description']} {item['quantity']} {item['unit_price_orig']:.2f} {item['currency']}")
+    lines.append(f"Grand Total {spec['grand_total']:.2f} {spec['currency']}")
+    lines.append(rng.choice(NOISE_LINES) if rng.random() < noise_level else NOISE_LINES[0])
+
+    noisy_lines = []
+    for line in lines:
+        if rng.random() < noise_level * 0.3:
+            noisy_lines.append("")
+        if rng.random() < noise_level * 0.2:
+            noisy_lines.append(rng.choice(NOISE_LINES))
+        indent = " " * rng.randint(0, int(6 * noise_level)) if noise_level else ""
+        noisy_lines.append(indent + line)
+    return "\n".join(noisy_lines)
+
+
+def _load_font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError: # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+def render_receipt_image(text, rng, noise_level=0.0, font_size=22, width=900):
+    """
+    Draws receipt text onto a grayscale image and degrades it like a phone scan
+    (slight rotation, blur and salt-and-pepper speckle, scaled by noise_level).
+    """
+    font = _load_font(font_size)
+    lines = text.split("\n")
+    line_height = int(font_size * 1.4)
+    height = line_height * (len(lines) + 4)
+
+    img = Image.new("L", (width, height), color=255)
+    draw = ImageDraw.Draw(img)
+    y = line_height * 2
+    for line in lines:
+        draw.text((40, y), line, fill=0, font=font)
+        y += line_height
+
+    if noise_level > 0:
+        img = img.rotate(rng.uniform(-2.0, 2.0) * noise_level, expand=True, fillcolor=255)
+        img = img.filter(ImageFilter.GaussianBlur(radius=noise_level))
+        pixels = np.array(img)
+        np_rng = np.random.default_rng(rng.randrange(2 ** 32))
+        speckle = np_rng.random(pixels.shape) < 0.01 * noise_level
+        pixels[speckle] = np_rng.integers(0, 256, int(speckle.sum()), dtype=np.uint8)
+        img = Image.fromarray(pixels)
+    return img
+
+
+def generate_mock_data(output_dir="data/incoming_receipts", num_receipts=20, seed=42,
+                       noise_level=0.3, min_items=1, max_items=8, render_images=True):
+    """
+    Generates a reproducible corpus of synthetic receipts.
+    Writes <bill_id>.png and <bill_id>.txt per receipt plus a manifest.json with the
+    ground truth, and returns the manifest entries.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = []
+    for idx in range(1, num_receipts + 1):
+        spec = generate_receipt_spec(rng, idx, min_items=min_items, max_items=max_items)
+        text = render_receipt_text(spec, rng, noise_level=noise_level)
+
+        text_path = os.path.join(output_dir, f"{spec['bill_id']}.txt")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        image_path = None
+        if render_images:
+            image_path = os.path.join(output_dir, f"{spec['bill_id']}.png")
+            render_receipt_image(text, rng, noise_level=noise_level).save(image_path)
+
+        manifest.append({"spec": spec, "text_path": text_path, "image_path": image_path})
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "noise_level": noise_level, "receipts": manifest}, f, indent=2)
+
+    print(f"Generated {num_receipts} synthetic receipts in {output_dir}")
+    return manifest
+
+
+def main():
+    generate_mock_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 
 import os
 import re
+import time
+import threading
 from PIL import Image
 import pytesseract
 from datetime import datetime
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+from src.ingest_gate import open_receipt_image, IngestRejected
+
 # --- Global Font Registration for PDF (moved here from all-in-one) ---
 custom_font_name = 'NotoSans'
 custom_font_path = 'NotoSans-Regular.ttf' # Assuming this file is in the project root
@@ -50,6 +54,41 @@ def setup_tesseract_and_font():
 
 # --- Parsing Logic (from your all-in-one app) ---
 
+# A line matching this opens the item section.
+ITEM_HEADER_PATTERN = re.compile(
+    r'(?:Description|Desc)\s+(?:Qty|Quantity)\s+(?:Price|Amount|Rate|Total)|^-+\s*(?:Description|Desc)\s.*?-+$', re.IGNORECASE)
+# Lines matching this are excluded from the item section.
+ITEM_STOP_PATTERN = re.compile(r'(Total|Subtotal|Tax|VAT|Discount|GST|Exclude GST)', re.IGNORECASE)
+
+def parse_item_line(line):
+    """
+    Parses a single 'description qty unit_price [currency]' line.
+    Returns the item dict, or None if the line doesn't look like an item.
+    """
+    item_match = re.search(r'(.+?)\s+(\d+)\s+(\d+\.?\d*)\s*([A-Za-z]{3}|\$|€|₹)?', line)
+    if not item_match:
+        return None
+
+    description = item_match.group(1).strip()
+    try:
+        quantity = int(item_match.group(2))
+        unit_price = float(item_match.group(3))
+    except ValueError:
+        return None
+    currency = item_match.group(4) if item_match.group(4) else "INR"
+
+    description = re.sub(r'\d+\.?\d*|\$|€|₹|USD|EUR|GBP|JPY|INR|AED', '', description, flags=re.IGNORECASE).strip()
+
+    if description and quantity > 0 and unit_price >= 0:
+        return {
+            "description": description,
+            "quantity": quantity,
+            "unit_price_orig": unit_price,
+            "currency": currency.upper()
+        }
+    return None
+
+
 def parse_ocr_text_to_bill(ocr_text, bill_idx):
     """
     Parses raw OCR text to extract structured bill details.
@@ -101,33 +140,15 @@ def parse_ocr_text_to_bill(ocr_text, bill_idx):
         line = line.strip()
         if not line: continue
 
-        if re.search(r'(?:Description|Desc)\s+(?:Qty|Quantity)\s+(?:Price|Amount|Rate|Total)', line, re.IGNORECASE) or \
-           re.search(r'^-+\s*(?:Description|Desc)\s.*?-+$', line, re.IGNORECASE):
+        if ITEM_HEADER_PATTERN.search(line):
             item_section_potential = True
             continue
 
-        if item_section_potential and not re.search(r'(Total|Subtotal|Tax|VAT|Discount|GST|Exclude GST)', line, re.IGNORECASE):
-            item_match = re.search(r'(.+?)\s+(\d+)\s+(\d+\.?\d*)\s*([A-Za-z]{3}|\$|€|₹)?', line)
-
-            if item_match:
-                description = item_match.group(1).strip()
-                try:
-                    quantity = int(item_match.group(2))
-                    unit_price = float(item_match.group(3))
-                    currency = item_match.group(4) if item_match.group(4) else "INR"
-
-                    description = re.sub(r'\d+\.?\d*|\$|€|₹|USD|EUR|GBP|JPY|INR|AED', '', description, flags=re.IGNORECASE).strip()
-
-                    if description and quantity > 0 and unit_price >= 0:
-                        bill_data["items"].append({
-                            "description": description,
-                            "quantity": quantity,
-                            "unit_price_orig": unit_price,
-                            "currency": currency.upper()
-                        })
-                        bill_data["parsed_successfully"] = True
-                except ValueError:
-                    pass
+        if item_section_potential and not ITEM_STOP_PATTERN.search(line):
+            item = parse_item_line(line)
+            if item:
+                bill_data["items"].append(item)
+                bill_data["parsed_successfully"] = True
 
     # --- New Logic: Fallback for extracting a 'Grand Total' from OCR text ---
     ocr_extracted_final_total = 0.0
@@ -176,23 +197,146 @@ def parse_ocr_text_to_bill(ocr_text, bill_idx):
     return bill_data
 
 
-def perform_ocr(image_path, bill_idx):
+# --- Adaptive OCR quality ladder ---
+# Tiers run cheapest first. A receipt stops at the first tier whose mean word
+# confidence reaches min_confidence and whose text parses successfully; only
+# hard receipts pay for the slower passes. If no tier passes, the best result seen is kept.
+# Set OCR_FAST_TESSDATA_DIR to a tessdata_fast checkout to use the fast LSTM
+# models on the first tier.
+OCR_TIERS = [
+    {"name": "fast", "max_side": 1200, "scale": 1.0, "config": "--oem 1 --psm 6", "min_confidence": 80.0, "fast_model": True},
+    {"name": "full_res", "max_side": None, "scale": 1.0, "config": "--oem 1 --psm 4", "min_confidence": 65.0, "fast_model": False},
+    {"name": "upscaled", "max_side": 4000, "scale": 2.0, "config": "--oem 1 --psm 3", "min_confidence": 0.0, "fast_model": False},
+]
+
+fast_tessdata_dir = os.environ.get("OCR_FAST_TESSDATA_DIR")
+
+_ocr_tier_stats = {tier["name"]: {"attempts": 0, "accepted": 0, "fallbacks": 0, "total_seconds": 0.0} for tier in OCR_TIERS}
+_ocr_tier_stats_lock = threading.Lock()
+
+
+def get_ocr_tier_stats():
+    """
+    Returns per-tier counts and mean latency since start-up or the last reset.
+    accepted counts results that passed the tier's confidence and parse checks
+    (hit_rate = accepted / attempts); fallbacks counts results kept from that tier
+    only because no tier passed.
+    """
+    with _ocr_tier_stats_lock:
+        snapshot = {name: dict(stats) for name, stats in _ocr_tier_stats.items()}
+    for stats in snapshot.values():
+        stats["hit_rate"] = stats["accepted"] / stats["attempts"] if stats["attempts"] else None
+        stats["mean_ms"] = stats["total_seconds"] / stats["attempts"] * 1000 if stats["attempts"] else None
+    return snapshot
+
+
+def reset_ocr_tier_stats():
+    with _ocr_tier_stats_lock:
+        for stats in _ocr_tier_stats.values():
+            stats.update(attempts=0, accepted=0, fallbacks=0, total_seconds=0.0)
+
+
+def _prepare_tier_image(img, tier):
+    """
+    Resizes the page for a tier. max_side caps how far an upscaling tier enlarges
+    but never makes it shrink a page that is already past the cap; only tiers with
+    scale <= 1.0 (the fast pass) downsample.
+    """
+    longest = max(img.size)
+    factor = tier["scale"]
+    if tier["max_side"] and longest * factor > tier["max_side"]:
+        factor = tier["max_side"] / longest
+        if tier["scale"] > 1.0:
+            factor = max(factor, 1.0)
+    if factor == 1.0:
+        return img
+    new_size = (max(1, int(img.width * factor)), max(1, int(img.height * factor)))
+    return img.resize(new_size, Image.LANCZOS if factor > 1.0 else Image.BILINEAR)
+
+
+def _text_and_confidence_from_data(data):
+    """
+    Rebuilds line-ordered text from image_to_data output and returns it with the
+    mean confidence of recognised words (-1 confidences mark non-word boxes).
+    """
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word:
+            continue
+        conf = float(data["conf"][i])
+        if conf >= 0:
+            confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    mean_conf = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, mean_conf
+
+
+def _run_ocr_tier(img, tier):
+    config = tier["config"]
+    if tier["fast_model"] and fast_tessdata_dir:
+        config = f"--tessdata-dir {fast_tessdata_dir} {config}"
+    data = pytesseract.image_to_data(_prepare_tier_image(img, tier), config=config, output_type=pytesseract.Output.DICT)
+    return _text_and_confidence_from_data(data)
+
+
+def ocr_image(img, bill_idx, tiers=None, parser=None):
+    """
+    Runs the OCR quality ladder on an already opened grayscale image and returns
+    parsed bill details, annotated with the tier used and its mean word confidence.
+    parser defaults to parse_ocr_text_to_bill.
+    """
+    parser = parser or parse_ocr_text_to_bill
+    tiers = tiers or OCR_TIERS
+    best = None
+    for tier in tiers:
+        start = time.perf_counter()
+        ocr_text, confidence = _run_ocr_tier(img, tier)
+        bill_details = parser(ocr_text, bill_idx)
+        elapsed = time.perf_counter() - start
+
+        bill_details["ocr_tier"] = tier["name"]
+        bill_details["ocr_confidence"] = round(confidence, 2)
+        accepted = confidence >= tier["min_confidence"] and bill_details["parsed_successfully"]
+        is_last = tier is tiers[-1]
+        with _ocr_tier_stats_lock:
+            stats = _ocr_tier_stats.setdefault(tier["name"], {"attempts": 0, "accepted": 0, "fallbacks": 0, "total_seconds": 0.0})
+            stats["attempts"] += 1
+            stats["total_seconds"] += elapsed
+            if accepted:
+                stats["accepted"] += 1
+
+        if accepted:
+            return bill_details
+        if best is None or (bill_details["parsed_successfully"], confidence) > (best["parsed_successfully"], best["ocr_confidence"]):
+            best = bill_details
+        if not is_last:
+            print(f"  OCR tier '{tier['name']}' confidence {confidence:.1f} too low or parse failed; escalating.")
+    with _ocr_tier_stats_lock:
+        _ocr_tier_stats[best["ocr_tier"]]["fallbacks"] += 1
+    return best
+
+
+def perform_ocr(image_path, bill_idx, parser=None, image=None):
     """
     Performs OCR on an image and returns parsed bill details.
+    parser (e.g. VendorTemplateStore.parse) replaces parse_ocr_text_to_bill if given.
+    image is an already decoded grayscale page (e.g. from a shared-memory slot);
+    when given, image_path is only used for messages.
     """
     print(f"  Performing OCR on: {image_path}")
     try:
-        img = Image.open(image_path)
-        img = img.convert("L") # Convert to grayscale for better OCR performance
-        ocr_text = pytesseract.image_to_string(img)
-
-        # print("\n--- Raw OCR Text ---")
-        # print(ocr_text)
-        # print("--------------------")
-
-        bill_details = parse_ocr_text_to_bill(ocr_text, bill_idx)
-        return bill_details
+        # Sniffs the type and checks size/pixel budgets from the header before decoding,
+        # then decodes to grayscale (at reduced scale for oversized scans).
+        img = image if image is not None else open_receipt_image(image_path)
+        return ocr_image(img, bill_idx, parser=parser)
 
+    except IngestRejected as e:
+        print(f"Error: {image_path} rejected at ingestion: {e}")
+        return None
     except FileNotFoundError:
         print(f"Error: Image file not found at {image_path}. Please check the path.")
         return None
@@ -201,4 +345,4 @@ def perform_ocr(image_path, bill_idx):
         return None
     except Exception as e:
         print(f"An error occurred during OCR or parsing of {image_path}: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -4,6 +4,7 @@
 import os
 import json
 from datetime import datetime
+import numpy as np
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
@@ -14,27 +15,31 @@ from reportlab.pdfbase.ttfonts import TTFont # For custom fonts
 from src.ocr_paddle import perform_ocr, active_font_for_pdf # Import OCR function and global font
 from src.llm_parser import LLMParser
 from src.tax_validator import TaxValidator
-from src.currency_converter import convert_to_inr
 from src.outlier_detector import OutlierDetector
+from src.vendor_templates import VendorTemplateStore
+from src.columnar import ItemColumns, build_rows, grouped_sum
 
 
 class Orchestrator:
-    def _init_(self):
+    def __init__(self, vendor_templates=None):
         # Initialize sub-services
+        self.vendor_templates = vendor_templates or VendorTemplateStore()
         self.llm_parser = LLMParser()
         self.tax_validator = TaxValidator()
         self.outlier_detector = OutlierDetector()
         print("Orchestrator initialized. All services ready.")
 
-    def process_single_receipt(self, file_path, bill_idx):
+    def process_single_receipt(self, file_path, bill_idx, image=None):
         """
         Coordinates the processing of a single receipt (image or PDF).
+        image, if given, is the already decoded page and skips decoding file_path.
         Returns structured data for the receipt.
         """
         print(f"  Orchestrating processing for: {file_path}")
         file_name = os.path.basename(file_path)
         extracted_data = {
             "file_name": file_name,
+            "bill_id": "N/A",
             "extracted_company": "N/A",
             "extracted_date": "N/A",
             "original_total": None,
@@ -51,36 +56,29 @@ class Orchestrator:
             # Step 1: OCR
             # Your OCR module now handles both image and PDF (if pdf2image is used internally by pytesseract/PIL,
             # which it is for PDFs by default if installed with Poppler).
-            bill_details_from_ocr = perform_ocr(file_path, bill_idx)
+            # Recurring vendors are parsed with their cached template; others fall back to the generic parser.
+            bill_details_from_ocr = perform_ocr(file_path, bill_idx, parser=self.vendor_templates.parse, image=image)
 
             if not bill_details_from_ocr:
                 extracted_data["pipeline_errors"].append("OCR or initial parsing failed.")
                 return extracted_data
 
             # Update extracted_data with initial OCR results
+            extracted_data["bill_id"] = bill_details_from_ocr.get("bill_id") or "N/A"
             extracted_data["extracted_company"] = bill_details_from_ocr.get("customer_name", "N/A")
             extracted_data["extracted_date"] = bill_details_from_ocr.get("bill_date", "N/A")
 
-            # Calculate totals for the current bill
-            sub_total_orig = 0.0
-            sub_total_inr = 0.0
-            currency_for_original_total = "N/A"
-            items_processed = 0
-
-            for item in bill_details_from_ocr.get("items", []):
-                # We need to sum up original totals for each item
-                item_original_total = item["quantity"] * item["unit_price_orig"]
-                sub_total_orig += item_original_total
-                currency_for_original_total = item["currency"] # Assuming one currency per bill for simplicity
-
-                # Convert to INR
-                inr_value, success = convert_to_inr(item["unit_price_orig"], item["currency"])
-                if success:
-                    item_total_inr = item["quantity"] * inr_value
-                    sub_total_inr += item_total_inr
-                    items_processed += 1
-                else:
-                    extracted_data["pipeline_errors"].append(f"Currency conversion failed for item '{item['description']}' from {item['currency']}")
+            # Calculate totals for the current bill with grouped array reductions
+            columns = ItemColumns.from_bills([bill_details_from_ocr])
+            sub_totals_orig, sub_totals_inr, converted_counts = columns.receipt_totals()
+            sub_total_orig = float(sub_totals_orig[0])
+            sub_total_inr = float(sub_totals_inr[0])
+            items_processed = int(converted_counts[0])
+            # Assuming one currency per bill for simplicity; report the last item's currency
+            currency_for_original_total = str(columns.currencies[columns.currency_idx[-1]]) if len(columns) else "N/A"
+
+            for item in columns.unconverted_items():
+                extracted_data["pipeline_errors"].append(f"Currency conversion failed for item '{item['description']}' from {item['currency']}")
 
             # Update extracted_data with calculated totals
             extracted_data["original_total"] = sub_total_orig if items_processed > 0 else None
@@ -123,7 +121,7 @@ class Orchestrator:
             elif not bill_details_from_ocr.get("parsed_successfully") and extracted_data["pipeline_errors"]:
                  # Already has errors, so no need to add another "partial" message
                  pass
-            elif not extracted_data["items"] and extracted_data["total_inr"] is None:
+            elif not bill_details_from_ocr.get("items") and extracted_data["total_inr"] is None:
                 extracted_data["pipeline_errors"].append("No items or total could be extracted.")
 
 
@@ -139,43 +137,61 @@ class Orchestrator:
         """
         Consolidates multiple sub-bills for a specific customer.
         This function now accepts the processed dictionaries directly.
+        sub_bills_included and items_summary are lists; for bulk consolidations
+        (LAZY_ROWS_THRESHOLD bills or more) they are LazyRows, which build rows on
+        access and need to_list() before JSON serialisation.
         """
         if not sub_bills_for_consolidation:
             return None
 
-        consolidated_items_summary = []
-        grand_total_inr = 0.0
-
-        for sub_bill in sub_bills_for_consolidation:
-            # Ensure 'total_inr' is a number; skip if not valid
-            current_bill_total_inr = sub_bill.get('total_inr')
-            if current_bill_total_inr is None or not isinstance(current_bill_total_inr, (int, float)):
-                print(f"Warning: Skipping sub-bill {sub_bill.get('file_name', 'Unknown')} due to invalid total_inr: {current_bill_total_inr}")
-                continue
+        # Column of per-bill INR totals; NaN marks bills that can't be consolidated.
+        totals_inr = np.fromiter(
+            (t if isinstance(t, (int, float)) else np.nan
+             for t in (sub_bill.get('total_inr') for sub_bill in sub_bills_for_consolidation)),
+            dtype=np.float64, count=len(sub_bills_for_consolidation))
+        valid = ~np.isnan(totals_inr)
+        for i in np.flatnonzero(~valid):
+            sub_bill = sub_bills_for_consolidation[i]
+            print(f"Warning: Skipping sub-bill {sub_bill.get('file_name', 'Unknown')} due to invalid total_inr: {sub_bill.get('total_inr')}")
+
+        valid_idx = np.flatnonzero(valid)
+        if not len(valid_idx):
+            print("No valid bills found for consolidation after filtering.")
+            return None
+        valid_totals = totals_inr[valid_idx]
 
-            # We list each sub-bill as a line item on the consolidated bill summary
-            consolidated_items_summary.append({
+        def summary_row(row):
+            # Description strings are only built for rows that actually get printed or drawn.
+            sub_bill = sub_bills_for_consolidation[valid_idx[row]]
+            current_bill_total_inr = float(valid_totals[row])
+            return {
                 "description": f"Bill: {sub_bill.get('file_name', 'N/A')} (ID: {sub_bill.get('bill_id', 'N/A')}, Date: {sub_bill.get('extracted_date', 'N/A')})",
                 "quantity": 1,
                 "unit_price_inr": current_bill_total_inr,
                 "total_inr": current_bill_total_inr,
                 "currency": "INR"
-            })
-            grand_total_inr += current_bill_total_inr
-
-        if not consolidated_items_summary:
-            print("No valid bills found for consolidation after filtering.")
-            return None
+            }
 
         return {
             "consolidated_bill_id": consolidated_bill_id,
             "customer_name": customer_name,
             "consolidated_date": consolidated_date,
-            "sub_bills_included": [sb.get('file_name', 'N/A') for sb in sub_bills_for_consolidation if sb.get('total_inr') is not None], # List original filenames
-            "items_summary": consolidated_items_summary,
-            "grand_total_inr": grand_total_inr
+            "sub_bills_included": build_rows(len(valid_idx), lambda row: sub_bills_for_consolidation[valid_idx[row]].get('file_name', 'N/A')), # List original filenames
+            "items_summary": build_rows(len(valid_idx), summary_row),
+            "customer_totals_inr": grouped_sum(
+                [sub_bills_for_consolidation[i].get('extracted_company', 'N/A') for i in valid_idx], valid_totals),
+            "grand_total_inr": float(valid_totals.sum())
         }
 
+    def consolidate_from_store(self, expense_store, consolidated_bill_id, customer_name, consolidated_date,
+                               filters=None, date_from=None, date_to=None):
+        """
+        Builds a consolidated bill from an ExpenseStore query (e.g. one run, one
+        customer or one quarter) instead of an in-memory list of sub-bills.
+        """
+        sub_bills = expense_store.query(filters=filters, date_from=date_from, date_to=date_to)
+        return self.consolidate_bills(sub_bills, consolidated_bill_id, customer_name, consolidated_date)
+
     def print_receipt(self, bill_data, type="consolidated"):
         """
         Prints a bill or consolidated bill in a receipt-like format to the console.
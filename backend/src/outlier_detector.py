@@ -3,7 +3,7 @@
 import numpy as np
 
 class OutlierDetector:
-    def _init_(self, method="simple_threshold"):
+    def __init__(self, method="simple_threshold"):
         self.method = method
         self.threshold = 10000.0 # Example threshold for total_inr in INR
         print(f"OutlierDetector initialized with method: {self.method} (Currently a mock service)")
@@ -0,0 +1,308 @@
+# src/rate_providers.py
+import os
+import json
+import time
+import argparse
+import threading
+import http.client
+import urllib.request
+from datetime import date
+from types import MappingProxyType
+
+try:
+    import fcntl # Unix only; used to single-flight refreshes across worker processes
+except ImportError:
+    fcntl = None
+
+
+class RateProviderError(Exception):
+    """
+    Raised when a provider can't produce a usable rate table.
+    """
+
+
+def rebase_to_inr(rates, base_currency):
+    """
+    Turns a quote table ("units of X per 1 base_currency") into INR per 1 unit of
+    each currency, the form convert_to_inr multiplies by.
+    """
+    rates = {str(code).upper().strip(): float(rate) for code, rate in rates.items()}
+    base_currency = str(base_currency).upper().strip()
+    rates.setdefault(base_currency, 1.0)
+    if "INR" not in rates:
+        raise RateProviderError(f"Rate table quoted in {base_currency} has no INR rate to rebase with.")
+    inr_per_base = rates["INR"]
+    return {code: inr_per_base / rate for code, rate in rates.items() if rate > 0}
+
+
+def parse_rate_payload(payload):
+    """
+    Validates a rates document ({"base_currency" or "base", "date", "rates"}) and
+    returns (INR rate table, rate date).
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("rates"), dict) or not payload["rates"]:
+        raise RateProviderError("Rate document has no 'rates' table.")
+    base_currency = payload.get("base_currency") or payload.get("base") or "INR"
+    try:
+        rates = rebase_to_inr(payload["rates"], base_currency)
+    except (TypeError, ValueError) as e:
+        raise RateProviderError(f"Rate document has a non-numeric rate: {e}")
+    return rates, payload.get("date")
+
+
+class StaticRateProvider:
+    """
+    Fixed in-memory table, already in INR per unit. Used for the built-in rates.
+    """
+
+    def __init__(self, rates, rate_date=None, name="static"):
+        self.rates = dict(rates)
+        self.rate_date = rate_date
+        self.name = name
+
+    def fetch(self):
+        return dict(self.rates), self.rate_date
+
+
+class FileRateProvider:
+    """
+    Reads a rates JSON file (e.g. data/mock_services/rates.json) for offline use.
+    """
+
+    def __init__(self, path="data/mock_services/rates.json"):
+        self.path = path
+        self.name = f"file:{path}"
+
+    def fetch(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RateProviderError(f"Could not read rates from {self.path}: {e}")
+        rates, rate_date = parse_rate_payload(payload)
+        if rate_date is None: # Fall back to the file's modification date
+            rate_date = date.fromtimestamp(os.path.getmtime(self.path)).isoformat()
+        return rates, rate_date
+
+
+class HttpRateProvider:
+    """
+    Fetches a rates JSON document over HTTP(S). Any service returning
+    {"base", "date", "rates"} works, including a local stub such as
+    `python -m http.server` serving a rates.json.
+    """
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self.name = f"http:{url}"
+
+    def fetch(self):
+        request = urllib.request.Request(self.url, headers={"Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read().decode("utf-8"))
+        except (OSError, ValueError, http.client.HTTPException) as e: # URLError and timeouts are OSErrors
+            raise RateProviderError(f"Could not fetch rates from {self.url}: {e}")
+        return parse_rate_payload(payload)
+
+
+class RateCache:
+    """
+    In-process rate cache in front of a provider.
+
+    Readers only ever load self._snapshot, an immutable dict that refreshes swap out
+    whole, so lookups take no lock. Once the snapshot is older than ttl_seconds, the
+    first caller to notice starts a background refresh and every caller, that one
+    included, keeps using the old table meanwhile; only a cold start (no table at all)
+    waits for a fetch. Refreshes are single-flight: a thread lock within the process and
+    a file lock next to the persisted snapshot across processes, with the snapshot re-read
+    after the lock is taken so a table another worker just fetched is adopted, not refetched.
+    If the provider fails, the last good snapshot (or the fallback provider's table
+    on a cold start) keeps being served.
+    """
+
+    def __init__(self, provider, ttl_seconds=3600, snapshot_path="data/rates_snapshot.json",
+                 fallback=None, retry_seconds=60):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self.fallback = fallback
+        self.retry_seconds = retry_seconds
+        self.metrics = {"refreshes": 0, "adopted": 0, "failures": 0}
+        self._snapshot = None
+        self._next_attempt = 0.0
+        self._refresh_lock = threading.Lock()
+
+        persisted = self._load_snapshot()
+        if persisted is not None:
+            if persisted["source"] != provider.name:
+                # Another provider's table: usable, but stale
+                persisted = self._make_snapshot(persisted["rates"], persisted["date"], persisted["source"], fetched_at=0.0)
+            self._snapshot = persisted
+
+    # --- Lookups (hot path, lock-free) ---
+
+    def get_rate(self, currency_code):
+        """
+        INR per 1 unit of currency_code, or None if the current table doesn't have it.
+        """
+        snapshot = self.snapshot()
+        return snapshot["rates"].get(currency_code) if snapshot is not None else None
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._refresh_cold() # Nothing to serve yet, so this one call has to wait
+        elif time.time() - snapshot["fetched_at"] > self.ttl_seconds:
+            self._refresh_in_background()
+        return snapshot
+
+    def get_status(self):
+        snapshot = self._snapshot
+        status = dict(self.metrics, ttl_seconds=self.ttl_seconds)
+        if snapshot is not None:
+            status.update(source=snapshot["source"], rate_date=snapshot["date"],
+                          age_seconds=round(time.time() - snapshot["fetched_at"], 1) if snapshot["fetched_at"] else None,
+                          currencies=len(snapshot["rates"]))
+        return status
+
+    # --- Refresh (cold path) ---
+
+    def refresh(self):
+        """
+        Forces a refresh now, ignoring the TTL and retry backoff.
+        """
+        self._next_attempt = 0.0
+        with self._refresh_lock:
+            return self._refresh_locked(force=True)
+
+    def _refresh_cold(self):
+        if time.time() < self._next_attempt: # Backing off after a failed fetch
+            return self._snapshot
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_in_background(self):
+        if time.time() < self._next_attempt or not self._refresh_lock.acquire(blocking=False):
+            return # Backing off, or a refresh is already running
+        try:
+            threading.Thread(target=self._background_refresh, name="rate-refresh", daemon=True).start()
+        except RuntimeError as e:
+            self._refresh_lock.release()
+            print(f"Warning: Could not start exchange-rate refresh: {e}")
+
+    def _background_refresh(self):
+        try:
+            self._refresh_locked()
+        except Exception as e: # Never let a refresh bug take the old table away
+            self.metrics["failures"] += 1
+            self._next_attempt = time.time() + self.retry_seconds
+            print(f"Warning: Exchange-rate refresh failed ({e}). Using last known rates.")
+        finally:
+            self._refresh_lock.release()
+
+    def _is_fresh(self, snapshot):
+        return snapshot is not None and time.time() - snapshot["fetched_at"] <= self.ttl_seconds
+
+    def _refresh_locked(self, force=False):
+        if not force and self._is_fresh(self._snapshot): # Refreshed while we waited for the lock
+            return self._snapshot
+
+        lock_file = self._acquire_file_lock()
+        try:
+            persisted = self._load_snapshot()
+            if not force and persisted is not None and persisted["source"] == self.provider.name and self._is_fresh(persisted):
+                self._snapshot = persisted
+                self.metrics["adopted"] += 1
+                return persisted
+
+            try:
+                rates, rate_date = self.provider.fetch()
+            except RateProviderError as e:
+                self.metrics["failures"] += 1
+                self._next_attempt = time.time() + self.retry_seconds
+                print(f"Warning: Exchange-rate refresh failed ({e}). Using last known rates.")
+                if self._snapshot is None and self.fallback is not None:
+                    rates, rate_date = self.fallback.fetch()
+                    self._snapshot = self._make_snapshot(rates, rate_date, self.fallback.name, fetched_at=0.0)
+                return self._snapshot
+
+            snapshot = self._make_snapshot(rates, rate_date, self.provider.name, fetched_at=time.time())
+            self._save_snapshot(snapshot)
+            self._snapshot = snapshot
+            self.metrics["refreshes"] += 1
+            return snapshot
+        finally:
+            if lock_file is not None:
+                lock_file.close() # Closing the file releases the flock
+
+    @staticmethod
+    def _make_snapshot(rates, rate_date, source, fetched_at):
+        rates = dict(rates)
+        rates["INR"] = 1.0
+        return MappingProxyType({
+            "source": source,
+            "date": rate_date,
+            "fetched_at": fetched_at,
+            "rates": MappingProxyType(rates)
+        })
+
+    # --- Persistence ---
+
+    def _acquire_file_lock(self):
+        if fcntl is None or not self.snapshot_path:
+            return None
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        lock_file = open(f"{self.snapshot_path}.lock", "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            return self._make_snapshot({code: float(rate) for code, rate in stored["rates"].items()},
+                                       stored.get("date"), stored["source"], float(stored["fetched_at"]))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Warning: Ignoring unreadable rate snapshot {self.snapshot_path}: {e}")
+            return None
+
+    def _save_snapshot(self, snapshot):
+        if not self.snapshot_path:
+            return
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": snapshot["source"], "base_currency": "INR", "date": snapshot["date"],
+                       "fetched_at": snapshot["fetched_at"], "rates": dict(snapshot["rates"])}, f, indent=2)
+        os.replace(tmp_path, self.snapshot_path) # Atomic, so readers never see a half-written file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or refresh the exchange-rate cache.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--url", help="HTTP rates endpoint (defaults to RATES_URL).")
+    source.add_argument("--file", help="Rates JSON file (defaults to RATES_FILE).")
+    parser.add_argument("--refresh", action="store_true", help="Fetch now, ignoring the TTL.")
+    args = parser.parse_args(argv)
+
+    from src.currency_converter import configure_rates, get_rate_cache
+
+    if args.url:
+        configure_rates(HttpRateProvider(args.url))
+    elif args.file:
+        configure_rates(FileRateProvider(args.file))
+    cache = get_rate_cache()
+    if args.refresh:
+        cache.refresh()
+    snapshot = cache.snapshot()
+    print(json.dumps(cache.get_status(), indent=2))
+    for code, rate in sorted(snapshot["rates"].items()):
+        print(f"  1 {code:<4} = {rate:>12.4f} INR")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# src/shm_images.py
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from src.ingest_gate import INGEST_LIMITS, open_receipt_image, IngestRejected
+from src.ocr_paddle import setup_tesseract_and_font
+from src.orchestrator import Orchestrator
+
+# Rows copied per step when writing a page into a slot, so the decoder never holds
+# a second full-size copy of the bitmap.
+COPY_STRIP_ROWS = 256
+
+# Marks an empty entry in the claims array (no receipt or no slot held).
+NO_CLAIM = -1
+
+# Seconds the pipeline may go without a result and without any worker holding a slot
+# before the run is declared stuck rather than waited on forever.
+STALL_SECONDS = 30.0
+
+
+class SharedImagePool:
+    """
+    Fixed ring of shared-memory slots, each big enough for one decoded grayscale page
+    (target_pixels bytes, the most open_receipt_image ever returns). Free slot numbers
+    circulate through a queue: a decoder takes one, writes a page into it and passes a
+    small handle on; the OCR worker maps the same memory and hands the slot back when
+    done. The slot count is the hard cap on decoded pages in flight. The queue is a
+    SimpleQueue so a release is in the pipe before the releasing call returns.
+
+    The pool pickles down to segment names plus the free-slot queue, so it can be passed
+    straight to worker processes, which attach to the existing segments.
+    """
+
+    def __init__(self, slots, slot_bytes=None, ctx=None):
+        ctx = ctx or mp.get_context("spawn")
+        self.slot_bytes = slot_bytes or INGEST_LIMITS["target_pixels"]
+        self.segments = [shared_memory.SharedMemory(create=True, size=self.slot_bytes) for _ in range(slots)]
+        self.free_slots = ctx.SimpleQueue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        self.owner = True
+
+    def __getstate__(self):
+        return {"names": [segment.name for segment in self.segments], "slot_bytes": self.slot_bytes,
+                "free_slots": self.free_slots}
+
+    def __setstate__(self, state):
+        self.slot_bytes = state["slot_bytes"]
+        self.segments = [shared_memory.SharedMemory(name=name) for name in state["names"]]
+        self.free_slots = state["free_slots"]
+        self.owner = False
+
+    def acquire(self):
+        """
+        Takes a free slot, blocking while every slot is in use (this is the backpressure
+        that keeps decoders from running ahead of OCR).
+        """
+        return self.free_slots.get()
+
+    def release(self, slot):
+        self.free_slots.put(slot)
+
+    def write(self, slot, img):
+        """
+        Copies a grayscale page into a slot. Returns the handle that describes it.
+        """
+        if img.mode != "L":
+            raise ValueError(f"Expected a grayscale ('L') image, got '{img.mode}'.")
+        width, height = img.size
+        if width * height > self.slot_bytes:
+            raise IngestRejected(f"Decoded page {width}x{height} does not fit a {self.slot_bytes} byte slot.", too_large=True)
+        pixels = np.ndarray((height, width), dtype=np.uint8, buffer=self.segments[slot].buf)
+        for top in range(0, height, COPY_STRIP_ROWS):
+            bottom = min(height, top + COPY_STRIP_ROWS)
+            pixels[top:bottom] = np.asarray(img.crop((0, top, width, bottom)))
+        return {"slot": slot, "width": width, "height": height}
+
+    def view(self, handle):
+        """
+        Returns the page in a slot as a read-only PIL image backed by the shared memory
+        itself (no copy). Drop it before releasing the slot.
+        """
+        size = handle["width"] * handle["height"]
+        buffer = self.segments[handle["slot"]].buf[:size]
+        return Image.frombuffer("L", (handle["width"], handle["height"]), buffer, "raw", "L", 0, 1)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        if self.owner:
+            for segment in self.segments:
+                segment.unlink()
+
+
+def _decode_worker(pool, decode_queue, ocr_queue, result_queue, claims, index):
+    """
+    Decodes receipts into free slots and queues their handles for OCR. The receipt and
+    slot being worked on are recorded in claims[2 * index : 2 * index + 2] so the parent
+    can recover them if this process dies.
+    """
+    while True:
+        task = decode_queue.get()
+        if task is None:
+            break
+        bill_idx, file_path = task
+        claims[2 * index] = bill_idx
+        slot = pool.acquire()
+        claims[2 * index + 1] = slot
+        try:
+            img = open_receipt_image(file_path)
+            try:
+                handle = pool.write(slot, img)
+            finally:
+                img.close()
+        except Exception as e: # IngestRejected, unreadable or missing files
+            claims[2 * index + 1] = NO_CLAIM
+            pool.release(slot)
+            print(f"Error: {file_path} could not be decoded: {e}")
+            result_queue.put((bill_idx, file_path, None))
+            claims[2 * index] = NO_CLAIM
+            continue
+        claims[2 * index + 1] = NO_CLAIM # The slot travels with the handle from here on
+        ocr_queue.put(dict(handle, bill_idx=bill_idx, file_path=file_path))
+        claims[2 * index] = NO_CLAIM
+    pool.close()
+
+
+def _ocr_worker(pool, ocr_queue, result_queue, claims, index):
+    """
+    Runs the orchestrator on pages mapped straight out of their slots, then recycles
+    the slot. Claims are recorded as in _decode_worker.
+    """
+    setup_tesseract_and_font()
+    orchestrator = Orchestrator()
+    while True:
+        handle = ocr_queue.get()
+        if handle is None:
+            break
+        claims[2 * index] = handle["bill_idx"]
+        claims[2 * index + 1] = handle["slot"]
+        img = pool.view(handle)
+        try:
+            result = orchestrator.process_single_receipt(handle["file_path"], handle["bill_idx"], image=img)
+        except Exception as e:
+            print(f"An unexpected error occurred processing {handle['file_path']}: {e}")
+            result = None
+        finally:
+            del img # Releases the buffer export so the slot can be reused (and closed)
+            claims[2 * index + 1] = NO_CLAIM
+            pool.release(handle["slot"])
+        result_queue.put((handle["bill_idx"], handle["file_path"], result))
+        claims[2 * index] = NO_CLAIM
+    pool.close()
+
+
+def process_receipts_shared(file_paths, ocr_workers=2, decode_workers=1, slots=None, start_idx=1):
+    """
+    Processes receipts with separate decode and OCR worker processes that exchange pages
+    through a SharedImagePool, so bitmaps are never pickled between processes.
+    Yields (bill_idx, file_path, result) in input order, holding back results that
+    finish early, so callers see the same sequence as the in-line path. result is
+    None if the receipt could not be decoded or processed.
+
+    Every worker is watched. One that dies mid-receipt has that receipt reported as
+    failed, its slot returned to the pool and a replacement started; one that dies
+    holding nothing is just dropped. Losing every OCR worker, or going STALL_SECONDS
+    without progress, aborts the run with a RuntimeError instead of hanging it.
+    """
+    file_paths = list(file_paths)
+    ctx = mp.get_context("spawn")
+    pool = SharedImagePool(slots or 2 * ocr_workers, ctx=ctx)
+    # SimpleQueues write straight to the pipe, so a handle or result is never stranded
+    # in a feeder thread of a worker that dies right after putting it.
+    decode_queue, ocr_queue, result_queue = ctx.Queue(), ctx.SimpleQueue(), ctx.SimpleQueue()
+    targets = [(_decode_worker, (pool, decode_queue, ocr_queue, result_queue))] * decode_workers
+    targets += [(_ocr_worker, (pool, ocr_queue, result_queue))] * ocr_workers
+    claims = ctx.RawArray("q", [NO_CLAIM] * 2 * len(targets)) # (bill_idx, slot) per worker
+
+    def start_worker(index):
+        target, args = targets[index]
+        proc = ctx.Process(target=target, args=args + (claims, index), daemon=True)
+        proc.start()
+        return proc
+
+    procs = []
+    retired = set() # Workers that died holding nothing and were not replaced
+    finished = {} # bill_idx -> result that arrived ahead of its turn
+    next_idx = start_idx
+    end_idx = start_idx + len(file_paths)
+
+    def collect_results():
+        arrived = False
+        while not result_queue.empty():
+            result = result_queue.get()
+            if result[0] >= next_idx: # Anything older was already reported as failed
+                finished.setdefault(result[0], result)
+            arrived = True
+        return arrived
+
+    try:
+        for index in range(len(targets)):
+            procs.append(start_worker(index))
+        for bill_idx, file_path in enumerate(file_paths, start=start_idx):
+            decode_queue.put((bill_idx, file_path))
+        for _ in range(decode_workers):
+            decode_queue.put(None)
+
+        last_progress = time.monotonic()
+        while next_idx < end_idx:
+            progressed = collect_results()
+            for index, proc in enumerate(procs):
+                if not proc.exitcode or index in retired: # Running, a decoder that ran out of work, or handled
+                    continue
+                collect_results() # Take anything it put before dying before judging its claim
+                bill_idx, slot = claims[2 * index], claims[2 * index + 1]
+                claims[2 * index] = claims[2 * index + 1] = NO_CLAIM
+                if slot != NO_CLAIM:
+                    pool.release(slot)
+                progressed = True
+                if bill_idx == NO_CLAIM: # Died between receipts (or at startup): carry on without it
+                    print(f"Warning: Worker {proc.name} exited with code {proc.exitcode}.")
+                    retired.add(index)
+                    continue
+                file_path = file_paths[bill_idx - start_idx]
+                print(f"Error: Worker {proc.name} died (exit code {proc.exitcode}) processing {file_path}. Restarting it.")
+                if bill_idx >= next_idx:
+                    finished.setdefault(bill_idx, (bill_idx, file_path, None))
+                procs[index] = start_worker(index)
+
+            while next_idx in finished:
+                yield finished.pop(next_idx)
+                next_idx += 1
+
+            if next_idx == end_idx:
+                break
+            if not any(proc.exitcode is None for proc in procs[decode_workers:]):
+                raise RuntimeError(f"All OCR worker processes exited with {end_idx - next_idx} receipts unprocessed.")
+            if progressed or any(claims[2 * index + 1] != NO_CLAIM for index in range(len(procs))):
+                last_progress = time.monotonic()
+            elif time.monotonic() - last_progress > STALL_SECONDS:
+                raise RuntimeError(f"No progress for {STALL_SECONDS:.0f}s with {end_idx - next_idx} receipts unprocessed.")
+            else:
+                time.sleep(0.05)
+    finally:
+        if next_idx == end_idx:
+            for _ in range(ocr_workers):
+                ocr_queue.put(None)
+            for proc in procs:
+                proc.join(timeout=10)
+        for proc in procs:
+            # Aborted or abandoned runs stop at once: a dead worker may have left a queue
+            # lock held, so the others can't be relied on to drain and exit.
+            if proc.is_alive():
+                proc.terminate()
+        pool.close()
@@ -1,7 +1,7 @@
 # src/tax_validator.py
 
 class TaxValidator:
-    def _init_(self):
+    def __init__(self):
         print("TaxValidator initialized (Currently a mock service)")
         # In a real scenario, this might load tax rules, VAT/GST databases, etc.
 
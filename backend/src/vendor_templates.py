@@ -0,0 +1,224 @@
+# src/vendor_templates.py
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl # Unix only; serialises saves from several worker processes
+except ImportError:
+    fcntl = None
+
+from src.ocr_paddle import parse_item_line, parse_ocr_text_to_bill, ITEM_HEADER_PATTERN, ITEM_STOP_PATTERN
+
+# Header fields a template anchors, with the shape their value must have.
+TEMPLATE_FIELDS = {
+    "bill_id": re.compile(r'[A-Za-z0-9\-\_]+'),
+    # Values the generic parser would trim (trailing Date/Inv/No/...) force a fallback.
+    "customer_name": re.compile(r'(?!.*\b(?:Date|Inv|Invoice|No|ID|Ref)\b).+', re.IGNORECASE),
+    "bill_date": re.compile(r'\d{1,4}[-/]\d{1,2}[-/]\d{1,4}'),
+}
+
+
+def _non_empty_lines(ocr_text):
+    return [line.strip() for line in ocr_text.split('\n') if line.strip()]
+
+
+def vendor_fingerprint(lines, header_lines=2):
+    """
+    Hashes the first few non-empty lines (vendor name and address on most receipts),
+    normalised so digit and punctuation noise from OCR doesn't change the key.
+    """
+    header = []
+    for line in lines[:header_lines]:
+        normalised = re.sub(r'\d', '#', line.lower())
+        normalised = re.sub(r'[^a-z#]+', ' ', normalised).strip()
+        header.append(normalised)
+    return hashlib.sha1("|".join(header).encode("utf-8")).hexdigest()[:16]
+
+
+def learn_template(lines, bill_data):
+    """
+    Derives a per-vendor extraction template from a successful generic parse:
+    the line offset and literal prefix of each header field, and where the item
+    block starts. Returns None if the layout can't be described that way.
+    """
+    if not bill_data.get("parsed_successfully") or not bill_data.get("items"):
+        return None
+
+    fields = {}
+    for field in TEMPLATE_FIELDS:
+        value = str(bill_data.get(field, ""))
+        for offset, line in enumerate(lines):
+            if value and line.endswith(value) and len(line) > len(value):
+                fields[field] = {"line": offset, "prefix": line[:-len(value)]}
+                break
+        else:
+            return None
+
+    for offset, line in enumerate(lines):
+        if ITEM_HEADER_PATTERN.search(line):
+            return {"fields": fields, "items_start": offset + 1, "items_header": line}
+    return None
+
+
+def _nearby_offsets(offset, line_count, window):
+    """
+    Yields offset, offset-1, offset+1, ... within window, so a stray blank or junk
+    line above a field doesn't invalidate the whole template.
+    """
+    for delta in range(window + 1):
+        for candidate in ((offset,) if delta == 0 else (offset - delta, offset + delta)):
+            if 0 <= candidate < line_count:
+                yield candidate
+
+
+def apply_template(template, lines, bill_idx, window=3):
+    """
+    Extracts bill details using a cached template. Returns None on any mismatch
+    so the caller can fall back to the generic parser.
+    """
+    bill_data = {"bill_id": None, "customer_name": None, "bill_date": None, "items": [],
+                 "parsed_successfully": True, "parsed_by": "vendor_template"}
+
+    for field, spec in template["fields"].items():
+        for offset in _nearby_offsets(spec["line"], len(lines), window):
+            if lines[offset].startswith(spec["prefix"]):
+                value = lines[offset][len(spec["prefix"]):].strip()
+                if TEMPLATE_FIELDS[field].fullmatch(value):
+                    bill_data[field] = value
+                    break
+        else:
+            return None
+
+    for offset in _nearby_offsets(template["items_start"] - 1, len(lines), window):
+        if lines[offset] == template["items_header"]:
+            start = offset + 1
+            break
+    else:
+        return None
+    # Same item rules as the generic parser, but starting straight at the known offset.
+    for line in lines[start:]:
+        if ITEM_STOP_PATTERN.search(line):
+            continue
+        item = parse_item_line(line)
+        if item is not None:
+            bill_data["items"].append(item)
+
+    return bill_data if bill_data["items"] else None
+
+
+class VendorTemplateStore:
+    """
+    LRU-bounded, JSON-persisted cache of vendor extraction templates keyed by
+    header fingerprint. parse() is a drop-in replacement for parse_ocr_text_to_bill:
+    known vendors take the template fast path, everything else (and any template
+    that no longer fits) goes through the generic parser, whose successful result
+    is learned as the vendor's new template.
+    """
+
+    def __init__(self, path="data/vendor_templates.json", capacity=500, header_lines=2):
+        self.path = path
+        self.capacity = capacity
+        self.header_lines = header_lines
+        self.templates = OrderedDict() # fingerprint -> template, least recently used first
+        self.metrics = {"hits": 0, "misses": 0, "stale": 0, "learned": 0, "evictions": 0}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load vendor templates from {self.path}: {e}")
+            return
+        with self.lock:
+            self.templates = OrderedDict(stored.get("templates", []))
+            while len(self.templates) > self.capacity:
+                self.templates.popitem(last=False)
+        print(f"Loaded {len(self.templates)} vendor templates from {self.path}")
+
+    def _read_stored(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("templates", [])
+        except (OSError, ValueError):
+            return []
+
+    def save(self):
+        """
+        Writes the templates through a unique temp file. Saves are serialised per
+        process by save_lock and across processes by a file lock; under that lock,
+        vendors another process learned meanwhile are merged in rather than dropped.
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self.save_lock, open(f"{self.path}.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when lock_file closes
+            with self.lock:
+                merged = OrderedDict((k, v) for k, v in self._read_stored() if k not in self.templates)
+                merged.update(self.templates)
+            while len(merged) > self.capacity:
+                merged.popitem(last=False)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".vendor_templates.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"templates": list(merged.items())}, f)
+                os.replace(tmp_path, self.path) # Atomic, so readers never see a half-written file
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def get_metrics(self):
+        with self.lock:
+            metrics = dict(self.metrics, size=len(self.templates), capacity=self.capacity)
+        lookups = metrics["hits"] + metrics["misses"] + metrics["stale"]
+        metrics["hit_rate"] = metrics["hits"] / lookups if lookups else None
+        return metrics
+
+    def parse(self, ocr_text, bill_idx):
+        lines = _non_empty_lines(ocr_text)
+        fingerprint = vendor_fingerprint(lines, self.header_lines)
+
+        with self.lock:
+            template = self.templates.get(fingerprint)
+            if template is not None:
+                self.templates.move_to_end(fingerprint)
+
+        if template is not None:
+            bill_data = apply_template(template, lines, bill_idx)
+            if bill_data is not None:
+                with self.lock:
+                    self.metrics["hits"] += 1
+                return bill_data
+
+        bill_data = parse_ocr_text_to_bill(ocr_text, bill_idx)
+        new_template = learn_template(lines, bill_data)
+        with self.lock:
+            self.metrics["stale" if template is not None else "misses"] += 1
+            is_new_vendor = fingerprint not in self.templates
+            if new_template is not None:
+                self.templates[fingerprint] = new_template
+                self.templates.move_to_end(fingerprint)
+                self.metrics["learned"] += 1
+                while len(self.templates) > self.capacity:
+                    self.templates.popitem(last=False)
+                    self.metrics["evictions"] += 1
+        # Persist when a vendor is first seen; refreshed templates ride along with the next save.
+        if new_template is not None and is_new_vendor:
+            try:
+                self.save()
+            except OSError as e: # Persistence is best effort; the parse itself succeeded
+                print(f"Warning: Could not save vendor templates to {self.path}: {e}")
+        return bill_data
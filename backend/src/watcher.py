@@ -4,7 +4,7 @@ import time
 import os
 
 class FileWatcher:
-    def _init_(self, directory_to_watch, callback):
+    def __init__(self, directory_to_watch, callback):
         self.directory = directory_to_watch
         self.callback = callback
         self.seen_files = set(os.listdir(directory_to_watch)) # Initialize with existing files
@@ -30,6 +30,6 @@ class FileWatcher:
 #     processed_data = orchestrator.process_single_receipt(file_path, 999) # Placeholder ID
 #     print(f"Finished processing new file: {file_path}, Data: {processed_data}")
 
-# if _name_ == "_main_":
+# if __name__ == "__main__":
 #     watcher = FileWatcher("data/incoming_receipts", process_new_file)
 #     watcher.start_watching()
\ No newline at end of file
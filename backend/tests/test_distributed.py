@@ -0,0 +1,54 @@
+import pytest
+
+from src.distributed import run_coordinator
+from src.job_queue import SQLiteJobQueue
+
+
+class FakeOrchestrator:
+    def __init__(self, fail_report=False):
+        self.fail_report = fail_report
+        self.reports = []
+
+    def consolidate_bills(self, bills, bill_id, customer_name, bill_date):
+        return {"bill_id": bill_id, "bills": bills}
+
+    def generate_pdf_report(self, bill_data, filename, type):
+        if self.fail_report:
+            raise OSError("disk full")
+        self.reports.append(filename)
+
+
+@pytest.fixture
+def finished_batch(tmp_path):
+    job_queue = SQLiteJobQueue(str(tmp_path / "queue.db"), lease_seconds=0.2)
+    batch_id = job_queue.submit_batch(["a.png"])
+    job = job_queue.claim("w1")
+    job_queue.complete(job["job_id"], "w1", {"file_name": "a.png"})
+    return job_queue, batch_id
+
+
+def test_failed_report_leaves_batch_for_next_coordinator(finished_batch, tmp_path):
+    job_queue, batch_id = finished_batch
+    with pytest.raises(OSError):
+        run_coordinator(job_queue, batch_id, orchestrator=FakeOrchestrator(fail_report=True),
+                        coordinator_id="c1", output_dir=str(tmp_path))
+    assert job_queue.consolidation_state(batch_id)["consolidated_at"] is None
+
+    orchestrator = FakeOrchestrator()
+    assert run_coordinator(job_queue, batch_id, orchestrator=orchestrator, coordinator_id="c2",
+                           poll_interval=0.05, output_dir=str(tmp_path))["bill_id"] == f"GRAND_CB_{batch_id}"
+    assert len(orchestrator.reports) == 1
+    assert job_queue.consolidation_state(batch_id)["consolidated_by"] == "c2"
+
+
+def test_coordinator_takes_over_after_claimant_dies(finished_batch, tmp_path):
+    job_queue, batch_id = finished_batch
+    assert job_queue.claim_consolidation(batch_id, "c1") # c1 crashes without completing
+
+    orchestrator = FakeOrchestrator()
+    assert run_coordinator(job_queue, batch_id, orchestrator=orchestrator, coordinator_id="c2",
+                           poll_interval=0.05, output_dir=str(tmp_path)) is not None
+    assert len(orchestrator.reports) == 1
+
+    assert run_coordinator(job_queue, batch_id, orchestrator=FakeOrchestrator(), coordinator_id="c3",
+                           output_dir=str(tmp_path)) is None
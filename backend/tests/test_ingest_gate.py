@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.ingest_gate import open_receipt_image, inspect_receipt_file, IngestRejected, INGEST_LIMITS
+
+# Small budgets so "oversized" test images stay quick to build.
+LIMITS = dict(INGEST_LIMITS, target_pixels=1_000_000)
+
+
+def _receipt_pixels(width, height):
+    # Dark text-like bars on white, so a wrong-mode reduce would be visible as well as fatal.
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    pixels[np.arange(height) % 40 < 10, :] = 0
+    return pixels
+
+
+def _save(tmp_path, name, img, **kwargs):
+    path = tmp_path / name
+    img.save(path, **kwargs)
+    return str(path)
+
+
+@pytest.mark.parametrize("name, build, save_kwargs", [
+    ("fax.tif", lambda px: Image.fromarray(px).convert("1"), {"compression": "group4"}),
+    ("palette.png", lambda px: Image.fromarray(px).convert("P"), {}),
+    ("palette.gif", lambda px: Image.fromarray(px).convert("P"), {}),
+    ("deep.png", lambda px: Image.fromarray(px.astype(np.uint16) * 257), {}),
+    ("photo.jpg", lambda px: Image.fromarray(px).convert("RGB"), {"quality": 90}),
+    ("rgb.png", lambda px: Image.fromarray(px).convert("RGB"), {}),
+])
+def test_oversized_images_are_reduced_to_grayscale(tmp_path, name, build, save_kwargs):
+    path = _save(tmp_path, name, build(_receipt_pixels(2500, 1800)), **save_kwargs)
+    with Image.open(path) as original:
+        assert original.width * original.height > LIMITS["target_pixels"]
+
+    gray = open_receipt_image(path, LIMITS)
+    assert gray.mode == "L"
+    assert gray.width * gray.height <= LIMITS["target_pixels"]
+    assert gray.getextrema()[0] < 128 < gray.getextrema()[1] # Text survived the reduction
+
+
+def test_small_images_keep_their_size(tmp_path):
+    path = _save(tmp_path, "small.gif", Image.fromarray(_receipt_pixels(400, 300)).convert("P"))
+    assert open_receipt_image(path, LIMITS).size == (400, 300)
+
+
+def test_rejects_non_images_and_pixel_bombs(tmp_path):
+    text_path = tmp_path / "notes.png"
+    text_path.write_bytes(b"not an image at all")
+    with pytest.raises(IngestRejected) as rejected:
+        inspect_receipt_file(str(text_path))
+    assert not rejected.value.too_large
+
+    path = _save(tmp_path, "huge.png", Image.new("1", (4000, 3000)))
+    with pytest.raises(IngestRejected) as rejected:
+        inspect_receipt_file(path, dict(INGEST_LIMITS, max_pixels=10_000_000))
+    assert rejected.value.too_large
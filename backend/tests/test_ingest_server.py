@@ -0,0 +1,59 @@
+import io
+import os
+import asyncio
+
+import aiohttp
+from aiohttp.test_utils import TestServer, TestClient
+from PIL import Image
+
+from src.ingest_server import IngestService
+
+
+class FakeOrchestrator:
+    def process_single_receipt(self, file_path, bill_idx):
+        assert os.path.exists(file_path)
+        return {"file_name": os.path.basename(file_path), "bill_idx": bill_idx}
+
+
+def _png_bytes():
+    buffer = io.BytesIO()
+    Image.new("L", (200, 300), 255).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _upload_and_wait(service, uploads):
+    client = TestClient(TestServer(service.build_app()))
+    await client.start_server()
+    try:
+        form = aiohttp.FormData()
+        for file_name, data in uploads:
+            form.add_field("file", data, filename=file_name, content_type="application/octet-stream")
+        response = await client.post("/receipts", data=form)
+        body = await response.json()
+        jobs = []
+        for accepted in body.get("jobs", []):
+            while True:
+                job = await (await client.get(accepted["status_url"])).json()
+                if job["status"] in ("done", "failed"):
+                    break
+                await asyncio.sleep(0.01)
+            jobs.append(job)
+        return response.status, body, jobs
+    finally:
+        await client.close()
+
+
+def test_results_keep_original_file_name_and_uploads_are_removed(tmp_path):
+    service = IngestService(orchestrator=FakeOrchestrator(), upload_dir=str(tmp_path / "uploads"), workers=2)
+    status, _, jobs = asyncio.run(_upload_and_wait(service, [("receipt.png", _png_bytes()), ("receipt.png", _png_bytes())]))
+    assert status == 202
+    assert [job["result"]["file_name"] for job in jobs] == ["receipt.png", "receipt.png"]
+    assert os.listdir(tmp_path / "uploads") == []
+
+
+def test_rejected_upload_leaves_nothing_behind(tmp_path):
+    service = IngestService(orchestrator=FakeOrchestrator(), upload_dir=str(tmp_path / "uploads"), workers=1)
+    status, body, _ = asyncio.run(_upload_and_wait(service, [("notes.txt", b"not an image at all")]))
+    assert status == 415
+    assert body["rejected"][0]["file_name"] == "notes.txt"
+    assert os.listdir(tmp_path / "uploads") == []
@@ -0,0 +1,129 @@
+import time
+import sqlite3
+
+import pytest
+
+from src.job_queue import SQLiteJobQueue
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "queue.db"), lease_seconds=0.2, max_attempts=2)
+
+
+def test_claims_in_bill_order_and_completes(job_queue):
+    batch_id = job_queue.submit_batch(["a.png", "b.png"])
+    first = job_queue.claim("w1")
+    second = job_queue.claim("w2")
+    assert (first["bill_idx"], second["bill_idx"]) == (1, 2)
+    assert job_queue.claim("w3") is None
+
+    assert job_queue.complete(first["job_id"], "w1", {"file_name": "a.png"})
+    assert job_queue.complete(second["job_id"], "w2", {"file_name": "b.png"})
+    assert job_queue.is_batch_finished(batch_id)
+    assert [r["file_name"] for r in job_queue.batch_results(batch_id)] == ["a.png", "b.png"]
+
+
+def test_expired_lease_is_reclaimed_and_late_complete_rejected(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    job = job_queue.claim("w1")
+    assert job_queue.claim("w2") is None # Still leased
+
+    time.sleep(0.3) # w1 "dies" and its lease lapses
+    reclaimed = job_queue.claim("w2")
+    assert reclaimed["job_id"] == job["job_id"]
+    assert reclaimed["attempts"] == 2
+
+    assert not job_queue.renew_lease(job["job_id"], "w1")
+    assert not job_queue.complete(job["job_id"], "w1", {"from": "w1"})
+    assert job_queue.complete(job["job_id"], "w2", {"from": "w2"})
+    assert job_queue.batch_results(batch_id) == [{"from": "w2"}]
+
+
+def test_renewed_lease_is_not_reclaimed(job_queue):
+    job_queue.submit_batch(["a.png"])
+    job = job_queue.claim("w1")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert job_queue.renew_lease(job["job_id"], "w1")
+    assert job_queue.claim("w2") is None
+
+
+def test_job_fails_after_max_attempts_of_expired_leases(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    job_queue.claim("w1")
+    time.sleep(0.3)
+    job_queue.claim("w2")
+    time.sleep(0.3)
+
+    assert job_queue.claim("w3") is None
+    assert job_queue.batch_progress(batch_id) == {"failed": 1}
+    assert job_queue.is_batch_finished(batch_id)
+    assert job_queue.batch_failures(batch_id)[0]["file_path"] == "a.png"
+
+
+def test_job_fails_after_max_attempts_of_errors(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    job = job_queue.claim("w1")
+    assert job_queue.fail(job["job_id"], "w1", "decode error")
+    assert job_queue.batch_progress(batch_id) == {"pending": 1}
+
+    job = job_queue.claim("w2")
+    assert job_queue.fail(job["job_id"], "w2", "decode error")
+    assert job_queue.batch_progress(batch_id) == {"failed": 1}
+    assert job_queue.batch_failures(batch_id)[0]["error"] == "decode error"
+
+
+def test_empty_and_unknown_batches(job_queue):
+    with pytest.raises(ValueError):
+        job_queue.submit_batch([])
+    assert job_queue.batch_job_count("BATCH_missing") is None
+    assert job_queue.batch_job_count(job_queue.submit_batch(["a.png"])) == 1
+
+
+def test_consolidation_claimed_once(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    assert job_queue.claim_consolidation(batch_id, "c1")
+    assert not job_queue.claim_consolidation(batch_id, "c2")
+
+
+def test_consolidation_lease_lapses_to_another_coordinator(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    assert job_queue.claim_consolidation(batch_id, "c1")
+    time.sleep(0.3) # c1 dies before writing the report
+    assert job_queue.claim_consolidation(batch_id, "c2")
+
+    assert not job_queue.renew_consolidation(batch_id, "c1")
+    assert not job_queue.complete_consolidation(batch_id, "c1")
+    assert job_queue.complete_consolidation(batch_id, "c2")
+    assert job_queue.consolidation_state(batch_id)["consolidated_by"] == "c2"
+
+
+def test_completed_consolidation_is_final(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    assert job_queue.claim_consolidation(batch_id, "c1")
+    assert job_queue.consolidation_state(batch_id)["consolidated_at"] is None
+    assert job_queue.complete_consolidation(batch_id, "c1")
+
+    time.sleep(0.3)
+    assert not job_queue.claim_consolidation(batch_id, "c2")
+    assert job_queue.consolidation_state(batch_id)["consolidated_at"] is not None
+
+
+def test_released_consolidation_can_be_claimed_at_once(job_queue):
+    batch_id = job_queue.submit_batch(["a.png"])
+    assert job_queue.claim_consolidation(batch_id, "c1")
+    assert job_queue.release_consolidation(batch_id, "c1")
+    assert job_queue.claim_consolidation(batch_id, "c2")
+
+
+def test_old_queue_file_gains_consolidation_lease_column(tmp_path):
+    db_path = str(tmp_path / "old.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE batches (batch_id TEXT PRIMARY KEY, created_at REAL NOT NULL, "
+                     "consolidated_by TEXT, consolidated_at REAL)")
+        conn.execute("INSERT INTO batches VALUES ('BATCH_old', 0, 'c0', 1.0)")
+    job_queue = SQLiteJobQueue(db_path)
+    assert not job_queue.claim_consolidation("BATCH_old", "c1") # Consolidated under the old scheme
+    batch_id = job_queue.submit_batch(["a.png"])
+    assert job_queue.claim_consolidation(batch_id, "c1")
@@ -0,0 +1,24 @@
+import pytest
+from PIL import Image
+
+from src.ocr_paddle import OCR_TIERS, _prepare_tier_image
+
+TIERS = {tier["name"]: tier for tier in OCR_TIERS}
+
+
+@pytest.mark.parametrize("size, expected", [
+    ((800, 1200), (1600, 2400)), # Doubled
+    ((1200, 2500), (1920, 4000)), # Enlarged up to max_side
+    ((2000, 5000), (2000, 5000)), # Already past max_side: left alone, not shrunk
+])
+def test_upscaled_tier_never_downsamples(size, expected):
+    assert _prepare_tier_image(Image.new("L", size, 255), TIERS["upscaled"]).size == expected
+
+
+def test_fast_tier_still_downsamples():
+    assert _prepare_tier_image(Image.new("L", (2000, 5000), 255), TIERS["fast"]).size == (480, 1200)
+
+
+def test_full_res_tier_keeps_size():
+    img = Image.new("L", (2000, 5000), 255)
+    assert _prepare_tier_image(img, TIERS["full_res"]) is img
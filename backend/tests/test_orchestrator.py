@@ -0,0 +1,33 @@
+from PIL import Image
+
+import src.orchestrator as orchestrator_module
+from src.orchestrator import Orchestrator
+from src.vendor_templates import VendorTemplateStore
+from src.expense_store import ExpenseStore
+
+
+def _fake_ocr(bill_id):
+    def perform_ocr(file_path, bill_idx, parser=None, image=None):
+        return {"bill_id": bill_id, "customer_name": "Cafe Blue", "bill_date": "2024-03-01",
+                "items": [{"description": "Coffee", "quantity": 2, "unit_price_orig": 150.0, "currency": "INR"}],
+                "parsed_successfully": True}
+    return perform_ocr
+
+
+def test_bill_id_from_ocr_reaches_results_and_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(orchestrator_module, "perform_ocr", _fake_ocr("INV-2024-117"))
+    orchestrator = Orchestrator(vendor_templates=VendorTemplateStore(path=str(tmp_path / "templates.json")))
+    bill = orchestrator.process_single_receipt("receipt.png", 1, image=Image.new("L", (10, 10)))
+    assert bill["bill_id"] == "INV-2024-117"
+
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    store.add_receipts([bill])
+    assert store.query()[0]["bill_id"] == "INV-2024-117"
+    consolidated = orchestrator.consolidate_bills([bill], "GRAND_CB_test", "Me", "2024-03-31")
+    assert "ID: INV-2024-117" in consolidated["items_summary"][0]["description"]
+
+
+def test_missing_bill_id_reported_as_na(monkeypatch, tmp_path):
+    monkeypatch.setattr(orchestrator_module, "perform_ocr", _fake_ocr(None))
+    orchestrator = Orchestrator(vendor_templates=VendorTemplateStore(path=str(tmp_path / "templates.json")))
+    assert orchestrator.process_single_receipt("receipt.png", 1)["bill_id"] == "N/A"
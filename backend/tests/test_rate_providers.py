@@ -0,0 +1,106 @@
+import time
+import threading
+import http.client
+import urllib.request
+
+import pytest
+
+from src.rate_providers import RateCache, RateProviderError, HttpRateProvider
+
+
+class CountingProvider:
+    """
+    Serves a fixed table, counting fetches; each fetch takes `delay` seconds.
+    """
+
+    def __init__(self, rates, delay=0.0, name="counting"):
+        self.rates = rates
+        self.delay = delay
+        self.name = name
+        self.fetches = 0
+        self.lock = threading.Lock()
+
+    def fetch(self):
+        with self.lock:
+            self.fetches += 1
+        time.sleep(self.delay)
+        return dict(self.rates), "2024-01-01"
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_cold_start_fetches_once_and_persists(tmp_path):
+    provider = CountingProvider({"USD": 80.0})
+    cache = RateCache(provider, ttl_seconds=60, snapshot_path=str(tmp_path / "rates.json"))
+
+    assert cache.get_rate("USD") == 80.0
+    assert cache.get_rate("INR") == 1.0
+    assert cache.get_rate("SGD") is None
+    assert provider.fetches == 1
+    assert (tmp_path / "rates.json").exists()
+
+
+def test_concurrent_stale_lookups_fetch_once_without_blocking(tmp_path):
+    provider = CountingProvider({"USD": 80.0}, delay=0.3)
+    cache = RateCache(provider, ttl_seconds=0.2, snapshot_path=str(tmp_path / "rates.json"))
+    cache.get_rate("USD")
+    provider.rates = {"USD": 81.0}
+    time.sleep(0.25) # Let the table go stale
+
+    results, durations = [], []
+    def lookup():
+        start = time.perf_counter()
+        results.append(cache.get_rate("USD"))
+        durations.append(time.perf_counter() - start)
+    threads = [threading.Thread(target=lookup) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [80.0] * 32 # Old table served while the refresh runs
+    assert max(durations) < provider.delay # No lookup waited for the fetch
+    _wait_for(lambda: cache.metrics["refreshes"] == 2)
+    assert provider.fetches == 2
+    assert cache.get_rate("USD") == 81.0
+
+
+def test_second_cache_adopts_fresh_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / "rates.json")
+    first = CountingProvider({"USD": 80.0})
+    RateCache(first, ttl_seconds=60, snapshot_path=snapshot_path).get_rate("USD")
+
+    # A second worker process on the same snapshot must not fetch again.
+    second = CountingProvider({"USD": 99.0})
+    cache = RateCache(second, ttl_seconds=60, snapshot_path=snapshot_path)
+    assert cache.get_rate("USD") == 80.0
+    assert second.fetches == 0
+
+
+def test_failed_refresh_keeps_last_table(tmp_path):
+    provider = CountingProvider({"USD": 80.0})
+    cache = RateCache(provider, ttl_seconds=0.05, snapshot_path=str(tmp_path / "rates.json"))
+    cache.get_rate("USD")
+
+    def broken_fetch():
+        raise RateProviderError("service down")
+    provider.fetch = broken_fetch
+    time.sleep(0.1)
+    assert cache.get_rate("USD") == 80.0
+    _wait_for(lambda: cache.metrics["failures"] == 1)
+    assert cache.get_rate("USD") == 80.0
+
+
+def test_http_protocol_errors_become_provider_errors(monkeypatch):
+    def incomplete(*args, **kwargs):
+        raise http.client.IncompleteRead(b"{")
+    monkeypatch.setattr(urllib.request, "urlopen", incomplete)
+
+    with pytest.raises(RateProviderError):
+        HttpRateProvider("http://127.0.0.1:9/rates.json").fetch()